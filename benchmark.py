@@ -0,0 +1,327 @@
+"""Benchmarks for the Board hot paths with stored baselines.
+
+Every case builds its boards from fixed seeds, so runs on the same machine
+are comparable. Save a baseline, change the code, then compare:
+
+    python benchmark.py --save
+    python benchmark.py --compare           # exits 1 if a case got slower
+    python benchmark.py --filter probabilities --repeat 20
+    python benchmark.py --check             # solver accuracy against exact integers
+
+Cases compare on the fastest run; a case regresses when it is more than
+--threshold times slower than its baseline.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from collections import deque
+from functools import lru_cache
+
+import settings
+import s_logic
+from s_logic import Board, ProbabilityEngine
+from s_solver import combine_components_exact, patterns
+
+BASELINE_PATH = "benchmark_baseline.json"
+SEED = 2025
+
+# name -> (rows, cols, mines)
+BOARDS = {
+    **{difficulty: (settings.ROWS, settings.COLS, mines) for difficulty, mines in settings.DIFFICULTY_MINES.items()},
+    "100x100": (100, 100, 1600),
+    "500x500": (500, 500, 40000),
+}
+FRONTIER_SIZES = (10, 25, 50, 100, 200)
+FRONTIER_BOARD = (60, 60, 720)  # HARD density, large enough for a 200-tile frontier
+# (rows, cols, mines, random safe digs): thousands of frontier tiles in hundreds of islands
+SCATTERED_BOARDS = ((120, 120, 3600, 300), (150, 150, 4500, 500), (200, 200, 8000, 800))
+
+
+def new_board(name):
+    rows, cols, mines = BOARDS[name]
+    return Board(rows, cols, mines, seed=SEED)
+
+
+def started_board(name):
+    board = new_board(name)
+    board.start_placing(board.rows // 2, board.cols // 2)
+    return board
+
+
+def open_safely(board, done):
+    """Dig safe tiles outward from the first click (breadth first) until done(revealed, frontier) holds.
+
+    revealed counts the revealed tiles and frontier the covered tiles next to
+    a revealed clue; both are kept up to date from what each flood reveals.
+    """
+    cols = board.cols
+    revealed = 0
+    frontier = set()  # covered tiles next to a revealed clue
+
+    def dig(r, c):
+        nonlocal revealed
+        for index in board.flood(r, c):
+            revealed += 1
+            frontier.discard(index)
+            if board.counts[index]:
+                frontier.update(nr * cols + nc for nr, nc in board.iter_neighbours(*divmod(index, cols))
+                                if not board.revealed[nr * cols + nc])
+
+    start = (board.rows // 2, cols // 2)
+    dig(*start)
+    queue = deque([start])
+    seen = {start}
+    while queue and not done(revealed, len(frontier)):
+        r, c = queue.popleft()
+        for pos in board.iter_neighbours(r, c):
+            index = pos[0] * cols + pos[1]
+            if pos in seen or board.mines[index]:
+                continue
+            seen.add(pos)
+            queue.append(pos)
+            if not board.revealed[index]:
+                dig(*pos)
+                if done(revealed, len(frontier)):
+                    break
+    return board
+
+
+@lru_cache(maxsize=None)
+def early_game(name):
+    """Position right after the first click, as a save_state snapshot.
+
+    Nearly the whole board is still covered, so the solve is dominated by
+    the weights of the unconstrained outside tiles.
+    """
+    board = started_board(name)
+    board.dig(board.rows // 2, board.cols // 2)
+    return board.save_state()
+
+
+@lru_cache(maxsize=None)
+def mid_game(name):
+    """Position with half of the safe tiles revealed, as a save_state snapshot."""
+    board = started_board(name)
+    target = (board.rows * board.cols - board.total_mines) // 2
+    open_safely(board, lambda revealed, frontier: revealed >= target)
+    return board.save_state()
+
+
+@lru_cache(maxsize=None)
+def frontier_position(size):
+    """Position whose frontier has at least size tiles, as a save_state snapshot."""
+    rows, cols, mines = FRONTIER_BOARD
+    board = Board(rows, cols, mines, seed=SEED)
+    board.start_placing(rows // 2, cols // 2)
+    open_safely(board, lambda revealed, frontier: frontier >= size)
+    return board.save_state()
+
+
+@lru_cache(maxsize=None)
+def scattered(rows, cols, mines, digs):
+    """Position after the first click and digs random safe tiles, as a save_state snapshot."""
+    board = Board(rows, cols, mines, seed=SEED)
+    board.start_placing(rows // 2, cols // 2)
+    board.dig(rows // 2, cols // 2)
+    rng = random.Random(SEED)
+    safe = [index for index in range(rows * cols) if not board.mines[index]]
+    for index in rng.choices(safe, k=digs):
+        if not board.revealed[index]:
+            board.dig(*divmod(index, cols))
+    return board.save_state()
+
+
+# Setups: each builds fresh state and returns the zero-argument callable to time.
+
+def setup_place_mines(name):
+    board = new_board(name)
+    return lambda: board.place_mines(board.rows // 2, board.cols // 2)
+
+
+def setup_place_clues(name):
+    return started_board(name).place_clues
+
+
+def setup_dig(name):
+    board = started_board(name)
+    return lambda: board.dig(board.rows // 2, board.cols // 2)
+
+
+def setup_solve(board, state):
+    """Cold probabilities solve of a stored position."""
+    board.load_state(state)  # also resets the engine caches
+    patterns.entries.clear()  # and forget the island shapes earlier runs enumerated
+    return board.probabilities
+
+
+def setup_engine_reset(name):
+    """Rebuild of the solver's clue indexes from the board planes."""
+    board = new_board(name)
+    board.load_state(mid_game(name))
+    return ProbabilityEngine(board).reset
+
+
+def setup_save_state(name):
+    return started_board(name).save_state
+
+
+def setup_load_state(name):
+    board, state = new_board(name), mid_game(name)
+    return lambda: board.load_state(state)
+
+
+def setup_draw(name):
+    import pygame
+    from s_render import BoardRenderer
+    board = new_board(name)
+    board.load_state(mid_game(name))
+    renderer = BoardRenderer(board)
+    screen = pygame.Surface((renderer.camera.width, renderer.camera.height))
+    return lambda: renderer.draw(screen, full=True)
+
+
+def cases():
+    """Yield (name, setup) pairs; setup() returns the callable to time."""
+    for name in BOARDS:
+        yield f"place_mines/{name}", lambda name=name: setup_place_mines(name)
+        yield f"place_clues/{name}", lambda name=name: setup_place_clues(name)
+        yield f"dig/{name}", lambda name=name: setup_dig(name)
+    for name in ("HARD", "500x500"):
+        yield f"probabilities/early_game/{name}", lambda name=name: setup_solve(new_board(name), early_game(name))
+    for name in ("EASY", "MEDIUM", "HARD", "100x100"):
+        yield f"probabilities/mid_game/{name}", lambda name=name: setup_solve(new_board(name), mid_game(name))
+    for size in FRONTIER_SIZES:
+        yield (f"probabilities/frontier/{size}",
+               lambda size=size: setup_solve(Board(*FRONTIER_BOARD, seed=SEED), frontier_position(size)))
+    for name in ("HARD", "500x500"):
+        yield f"save_state/{name}", lambda name=name: setup_save_state(name)
+        yield f"load_state/{name}", lambda name=name: setup_load_state(name)
+        yield f"engine_reset/{name}", lambda name=name: setup_engine_reset(name)
+    try:
+        import pygame  # noqa: F401  drawing cases need pygame
+    except ImportError:
+        return
+    for name in ("HARD", "100x100"):
+        yield f"draw/{name}", lambda name=name: setup_draw(name)
+
+
+def check_positions():
+    """Yield (name, rows, cols, mines, state) for every position check() verifies."""
+    for name in ("EASY", "MEDIUM", "HARD", "100x100"):
+        yield (f"mid_game/{name}", *BOARDS[name], mid_game(name))
+    for size in FRONTIER_SIZES:
+        yield (f"frontier/{size}", *FRONTIER_BOARD, frontier_position(size))
+    for rows, cols, mines, digs in SCATTERED_BOARDS:
+        yield f"scattered/{rows}x{cols}", rows, cols, mines, scattered(rows, cols, mines, digs)
+
+
+def check(pattern=None, tolerance=1e-9):
+    """Compare probabilities() with a solve combining the islands in exact integers.
+
+    Returns the names of the positions where some tile differs by more than
+    tolerance, or where only one of the two found a consistent combination.
+    """
+    failures = []
+    for name, rows, cols, mines, state in check_positions():
+        if pattern and pattern not in name:
+            continue
+        solves = []
+        for combine in (s_logic.combine_components, combine_components_exact):
+            board = Board(rows, cols, mines, seed=SEED)
+            board.load_state(state)
+            saved, s_logic.combine_components = s_logic.combine_components, combine
+            try:
+                solves.append(board.probabilities())
+            finally:
+                s_logic.combine_components = saved
+        (probs, outside), (exact, exact_outside) = solves
+        error = max([abs(p - exact[pos]) for pos, p in probs.items()] + [abs(outside - exact_outside)])
+        fell_back = len(set(probs.values())) == 1 and len(set(exact.values())) > 1
+        if error > tolerance or fell_back:
+            failures.append(name)
+        print(f"{name:40s} max error {error:.2e}{'  FAILED' if name in failures else ''}")
+    return failures
+
+
+def run(pattern=None, repeat=7):
+    """Time every case matching pattern; returns {name: {"min_ms", "median_ms", "runs"}}."""
+    results = {}
+    for name, setup in cases():
+        if pattern and pattern not in name:
+            continue
+        times = []
+        for _ in range(repeat):
+            fn = setup()
+            start = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - start)
+        results[name] = {"min_ms": 1000 * min(times), "median_ms": 1000 * statistics.median(times), "runs": repeat}
+        print(f"{name:40s} {results[name]['min_ms']:10.3f} ms", file=sys.stderr)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Print a comparison table; returns the names of cases slower than threshold x baseline."""
+    regressions = []
+    print(f"{'case':40s} {'baseline':>12s} {'current':>12s} {'ratio':>7s}")
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:40s} {'-':>12s} {result['min_ms']:10.3f}ms {'new':>7s}")
+            continue
+        ratio = result["min_ms"] / base["min_ms"] if base["min_ms"] else 1.0
+        flag = ""
+        if ratio > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:40s} {base['min_ms']:10.3f}ms {result['min_ms']:10.3f}ms {ratio:6.2f}x{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--filter", help="only run cases whose name contains this text")
+    parser.add_argument("--repeat", type=int, default=7, help="timed runs per case")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline JSON file")
+    parser.add_argument("--save", action="store_true", help="store the results as the new baseline")
+    parser.add_argument("--compare", action="store_true", help="compare against the baseline")
+    parser.add_argument("--threshold", type=float, default=1.5, help="slowdown ratio counted as a regression")
+    parser.add_argument("--check", action="store_true",
+                        help="compare solver probabilities with exact integer arithmetic instead of timing")
+    args = parser.parse_args(argv)
+
+    if args.check:
+        failures = check(args.filter)
+        if failures:
+            print(f"{len(failures)} position(s) differ from the exact solve: {', '.join(failures)}")
+        return 1 if failures else 0
+
+    results = run(args.filter, args.repeat)
+
+    status = 0
+    if args.compare:
+        if not os.path.exists(args.baseline):
+            print(f"no baseline at {args.baseline}; run with --save first", file=sys.stderr)
+            return 2
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} case(s) slower than {args.threshold}x baseline: {', '.join(regressions)}")
+            status = 1
+    else:
+        print(json.dumps(results, indent=2))
+
+    if args.save:
+        with open(args.baseline, "w") as f:
+            json.dump({"python": sys.version.split()[0], "seed": SEED, "results": results}, f, indent=2)
+            f.write("\n")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
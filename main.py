@@ -1,99 +1,182 @@
+import argparse
 import pygame
 import settings
+import s_profile
 from s_logic import *
+from s_render import BoardRenderer
+from s_lazy import LazyBoard
+from s_save import save_game, GameFile, DIG, FLAG, DETECT, UNDO, REDO
+from s_worker import ProbabilityWorker
 from collections import Counter
 
+MIN_LABEL_FONT = 8  # smallest probability label font, in pixels; tiles too small for it show no labels
+
 class Game:
     def __init__(self):
         pygame.font.init()
 
-        self.screen = pygame.display.set_mode((settings.WIDTH, settings.HEIGHT + 80))
+        self.open_window()
         pygame.display.set_caption(settings.TITLE)
         self.clock = pygame.time.Clock()
         self.font = pygame.font.Font(settings.font_path, 30)
         self.prob_font = pygame.font.Font(settings.font_path, 16)
-        self.prob_grid = None
-        
-        self.undo_button = pygame.Rect(settings.UNDO_BUTTON_X, settings.UNDO_BUTTON_Y,
-                                      settings.UNDO_BUTTON_WIDTH, settings.UNDO_BUTTON_HEIGHT)
+        self.prob_result = None  # last finished (probs, outside_prob); stays on screen while a newer one is computed
+        self.prob_overlay = None  # labels for prob_result, rebuilt when it or the camera changes
+        self.prob_overlay_view = None  # camera position prob_overlay was drawn for
+        self.prob_worker = ProbabilityWorker()
+
+        self.prob_labels = {}  # tile size -> label atlas for that zoom level, see probability_labels
+
         self.button_hover = False
         self.is_showing_prob = False
         self.cheat_enabled = settings.CHEAT_ENABLED
 
+        self.text_cache = {}  # (font, text, colour) -> rendered surface
+        self.full_redraw = True  # repaint the whole window on the next frame
+        self.hud_state = None  # what the bottom bar showed when it was last drawn
+        self.show_profile = False  # F3: profiling summary in the bottom bar (needs --profile)
+
+    def open_window(self):
+        """(Re)create the window for the current viewport size from settings."""
+        self.screen = pygame.display.set_mode((settings.WIDTH, settings.HEIGHT + 80))
+        self.undo_button = pygame.Rect(settings.UNDO_BUTTON_X, settings.UNDO_BUTTON_Y,
+                                      settings.UNDO_BUTTON_WIDTH, settings.UNDO_BUTTON_HEIGHT)
+        self.full_redraw = True
+
     def new(self):
         print("Difficulty:", settings.DIFFICULTY)
         print("Mines:", settings.get_mine_amount())
         print('Cheat:', 'Enabled' if settings.CHEAT_ENABLED else 'Disabled')
-        self.board = Board()
-        self.undo_stack = []
+        self.board = LazyBoard() if settings.LAZY_BOARD else Board()
+        self.renderer = BoardRenderer(self.board)
+        self.undo_stack = []  # Moves that undo() can revert, most recent last
+        self.redo_stack = []  # Moves reverted by undo(), for redo()
+        self.actions = []  # move log for save files: (op, cell index)
         self.win = False
         self.detector = False
         self.detector_count = settings.DETECT_CHARGES
         self.cheat_enabled = settings.CHEAT_ENABLED
         self.has_left_clicked = False
+        self.full_redraw = True
+        self.prob_result = None
 
         self.update_probabilities()
 
     def update_probabilities(self):
-        """Recompute cached mine probabilities for drawing overlay."""
-        try:
-            self.prob_grid = self.board.probability_grid()
-        except Exception:
-            # Don't let probability calculation break the game loop.
-            self.prob_grid = None
+        """Ask the worker for new mine probabilities; receive_probabilities() picks them up."""
+        if isinstance(self.board, LazyBoard):
+            return  # the solver needs a fully generated board
+        self.prob_worker.submit(self.board)
+        self.prob_overlay = None  # drop labels on tiles this move revealed or flagged
+        if self.is_showing_prob:
+            self.full_redraw = True
+
+    def receive_probabilities(self):
+        """Show the worker's result once it is done; called every frame."""
+        result = self.prob_worker.poll()
+        if result is not None:
+            self.prob_result = result
+            self.prob_overlay = None
+            if self.is_showing_prob:
+                self.full_redraw = True
+
+    def render_text(self, font, text, colour):
+        """Render text once and reuse the surface while the content stays the same."""
+        key = (font, text, colour)
+        surface = self.text_cache.get(key)
+        if surface is None:
+            surface = self.text_cache[key] = font.render(text, True, colour)
+        return surface
+
+    @staticmethod
+    def probability_colour(pct):
+        if pct == 0: # 100% safe
+            return (0, 106, 0)
+        if pct == 100: # 100% mine
+            return (166, 0, 0)
+        return settings.BLACK
+
+    def probability_labels(self, size):
+        """Label atlas for tiles of size pixels, or None if no readable label fits in a tile.
+
+        The overlay only ever shows 0%..100%, and the colour follows the
+        value. The font is half the tile size, shrunk until "100%" fits.
+        """
+        if size not in self.prob_labels:
+            labels = None
+            for font_size in range(size // 2, MIN_LABEL_FONT - 1, -1):
+                font = pygame.font.Font(settings.font_path, font_size)
+                width, height = font.size("100%")
+                if width <= size and height <= size:
+                    labels = [font.render(f"{pct}%", True, self.probability_colour(pct)) for pct in range(101)]
+                    break
+            self.prob_labels[size] = labels
+        return self.prob_labels[size]
 
     def draw_probabilities(self):
-        
-        """Draw probability percentages on top of undug tiles."""
-        if not self.prob_grid:
-            return
-
-        for r in range(settings.ROWS):
-            for c in range(settings.COLS):
-                tile = self.board.board_list[r][c]
-                if tile.revealed or tile.flagged:
+        """Return a transparent viewport-sized surface with percentages on visible undug tiles.
+
+        Labels come from the pre-rendered atlas of the current zoom level and
+        are blitted in one call; draw() caches the result until prob_result or
+        the camera changes. Zoomed out too far for labels, the overlay is empty.
+        """
+        board, camera = self.board, self.renderer.camera
+        overlay = pygame.Surface((camera.width, camera.height), pygame.SRCALPHA)
+        size = camera.tile_size
+        atlas = self.probability_labels(size)
+        if self.prob_result is None or atlas is None:
+            return overlay
+        probs, outside = self.prob_result
+
+        r0, r1, c0, c1 = camera.visible_tiles()
+        labels = []
+        for r in range(r0, r1):
+            base = r * board.cols
+            for c in range(c0, c1):
+                if board.revealed[base + c] or board.flagged[base + c]:
                     continue
-
-                p = self.prob_grid[r][c]
-                pct = int(round(p * 100))
-                color = settings.BLACK
-
-                if pct == 0: # 100% safe
-                    color = (0, 106, 0)
-                elif pct == 100: # 100% mine
-                    color = (166, 0, 0)
-                    
-                text = self.prob_font.render(f"{pct}%", True, color)
-                rect = text.get_rect(center=(tile.x + settings.TILESIZE // 2, tile.y + settings.TILESIZE // 2))
-                self.screen.blit(text, rect)
+                text = atlas[int(round(probs.get((r, c), outside) * 100))]
+                labels.append((text, (c * size - camera.x + (size - text.get_width()) // 2,
+                                      r * size - camera.y + (size - text.get_height()) // 2)))
+        overlay.blits(labels, False)
+        return overlay
 
     def run(self):
         self.playing = True
         while self.playing:
             self.clock.tick(settings.FPS)
             self.events()
+            self.receive_probabilities()
             self.draw()
+            if s_profile.active is not None:
+                s_profile.active.end_frame()
         else:
             self.end_screen()
 
     def draw(self):
-        self.screen.fill(settings.BGCOLOUR)
-        self.board.draw(self.screen)
+        """Retained-mode frame: repaint only what changed since the last frame.
+
+        The board redraws its dirty tiles, the bottom bar is redrawn only when
+        its content changes, and only those rects are pushed to the display.
+        A full repaint happens after a new game, a probability update or an
+        overlay toggle.
+        """
+        full = self.full_redraw
+        self.full_redraw = False
+        if full:
+            self.screen.fill(settings.BGCOLOUR)
+            self.hud_state = None
+
+        rects = self.renderer.draw(self.screen, full)
 
         if self.cheat_enabled and self.is_showing_prob:
-            self.draw_probabilities()
-        
-        button_colour = settings.BUTTON_HOVER if self.button_hover else settings.BUTTON_COLOUR
-        pygame.draw.rect(self.screen, button_colour, self.undo_button, border_radius=8)
-        pygame.draw.rect(self.screen, settings.WHITE, self.undo_button, 2, border_radius=8)
-        
-        undo_text = self.font.render("UNDO", True, settings.BUTTON_TEXT)
-        text_rect = undo_text.get_rect(center=self.undo_button.center)
-        self.screen.blit(undo_text, text_rect)
-        
-        undo_count = len(self.undo_stack)
-        count_text = self.font.render(f"Undo: {undo_count}", True, settings.YELLOW)
-        self.screen.blit(count_text, (10, settings.HEIGHT + 10))
+            camera = self.renderer.camera
+            view = (camera.x, camera.y, camera.tile_size)
+            if self.prob_overlay is None or self.prob_overlay_view != view:
+                self.prob_overlay = self.draw_probabilities()
+                self.prob_overlay_view = view
+            for rect in rects:
+                self.screen.blit(self.prob_overlay, rect, rect)
 
         if self.detector:
             color = settings.GREEN
@@ -102,12 +185,42 @@ class Game:
             color = settings.RED
             status = "Inactive"
 
-        detector_text = self.font.render(
-            f"Detector: {status} ({self.detector_count})", True, color)
-        self.screen.blit(detector_text,
-                         (settings.WIDTH - detector_text.get_width() - 10, settings.HEIGHT + 10))
-
-        pygame.display.flip()
+        computing = self.cheat_enabled and self.is_showing_prob and self.prob_worker.busy
+        profile = s_profile.active.summary if self.show_profile else None
+        hud_state = (self.button_hover, len(self.undo_stack), status, self.detector_count, computing, profile)
+        if hud_state != self.hud_state:
+            self.hud_state = hud_state
+            hud_rect = pygame.Rect(0, settings.HEIGHT, settings.WIDTH, self.screen.get_height() - settings.HEIGHT)
+            self.screen.fill(settings.BGCOLOUR, hud_rect)
+
+            button_colour = settings.BUTTON_HOVER if self.button_hover else settings.BUTTON_COLOUR
+            pygame.draw.rect(self.screen, button_colour, self.undo_button, border_radius=8)
+            pygame.draw.rect(self.screen, settings.WHITE, self.undo_button, 2, border_radius=8)
+
+            undo_text = self.render_text(self.font, "UNDO", settings.BUTTON_TEXT)
+            text_rect = undo_text.get_rect(center=self.undo_button.center)
+            self.screen.blit(undo_text, text_rect)
+
+            undo_count = len(self.undo_stack)
+            count_text = self.render_text(self.font, f"Undo: {undo_count}", settings.YELLOW)
+            self.screen.blit(count_text, (10, settings.HEIGHT + 10))
+
+            detector_text = self.render_text(self.font, f"Detector: {status} ({self.detector_count})", color)
+            self.screen.blit(detector_text,
+                             (settings.WIDTH - detector_text.get_width() - 10, settings.HEIGHT + 10))
+
+            if computing:
+                computing_text = self.render_text(self.prob_font, "Computing probabilities...", settings.WHITE)
+                self.screen.blit(computing_text, (10, settings.HEIGHT + 50))
+            if profile:
+                profile_text = self.prob_font.render(profile, True, settings.WHITE)  # changes too often to cache
+                self.screen.blit(profile_text, (settings.WIDTH - profile_text.get_width() - 10, settings.HEIGHT + 50))
+            rects.append(hud_rect)
+
+        if full:
+            pygame.display.flip()
+        elif rects:
+            pygame.display.update(rects)
 
     def main_menu(self):
         menu_running = True
@@ -189,14 +302,17 @@ class Game:
 
                     if easy_button.collidepoint(pos):
                         settings.DIFFICULTY = "EASY"
+                        settings.CUSTOM_MINES = None
                         return
 
                     if medium_button.collidepoint(pos):
                         settings.DIFFICULTY = "MEDIUM"
+                        settings.CUSTOM_MINES = None
                         return
 
                     if hard_button.collidepoint(pos):
                         settings.DIFFICULTY = "HARD"
+                        settings.CUSTOM_MINES = None
                         return
                     
                     if cheat_button.collidepoint(pos):
@@ -210,64 +326,77 @@ class Game:
 
 
     def check_win(self):
-        for row in self.board.board_list:
-            for tile in row:
-                if tile.type != "X" and not tile.revealed:
-                    return False
-        return True
-
-    def save_state(self):
-        state = []
-        for row in range(settings.ROWS):
-            row_state = []
-            for col in range(settings.COLS):
-                tile = self.board.board_list[row][col]
-                row_state.append({
-                    'revealed': tile.revealed,
-                    'flagged': tile.flagged,
-                    'type': tile.type
-                })
-            state.append(row_state)
-        return state
-
-    def load_state(self, state):
-        for row in range(settings.ROWS):
-            for col in range(settings.COLS):
-                data = state[row][col]
-                tile = self.board.board_list[row][col]
-
-                tile.revealed = data['revealed']
-                tile.flagged = data['flagged']
-                tile.type = data['type']
-
-                if tile.type == "X":
-                    tile.image = settings.tile_mine
-                elif tile.type == "C":
-                    total_mines = self.board.check_neighbours(row, col)
-                    if total_mines > 0:
-                        tile.image = settings.tile_numbers[total_mines - 1]
-                elif tile.type == ".":
-                    tile.image = settings.tile_empty
+        return self.board.check_win()
 
     def undo(self):
         if self.undo_stack:
-            self.load_state(self.undo_stack.pop())
-            self.board.dug = []
-            for r in range(settings.ROWS):
-                for c in range(settings.COLS):
-                    if self.board.board_list[r][c].revealed:
-                        self.board.dug.append((r, c))
+            move = self.undo_stack.pop()
+            self.actions.append((UNDO, 0))
+            self.board.apply_move(move, undo=True)
+            self.detector_count += move.charges
+            self.redo_stack.append(move)
             if self.cheat_enabled:
                 self.update_probabilities()
 
-    def push_state(self):
-        current = self.save_state() 
-        if not self.undo_stack or current != self.undo_stack[-1]:
-            self.undo_stack.append(current)
+    def redo(self):
+        if self.redo_stack:
+            move = self.redo_stack.pop()
+            self.actions.append((REDO, 0))
+            self.board.apply_move(move, undo=False)
+            self.detector_count -= move.charges
+            self.undo_stack.append(move)
+            if self.cheat_enabled:
+                self.update_probabilities()
+
+    def push_state(self, charges=0):
+        """Close the move the board is recording and push it on the undo stack."""
+        move = self.board.end_move(charges)
+        if move is not None:
+            self.undo_stack.append(move)
+            self.redo_stack.clear()
+
+    def save_game(self):
+        if isinstance(self.board, LazyBoard):
+            print("Lazy boards can't be saved")
+            return
+        save_game(settings.SAVE_PATH, self.board, detector_count=self.detector_count,
+                  started=self.has_left_clicked, actions=self.actions)
+        print("Saved game to", settings.SAVE_PATH)
+
+    def load_game(self):
+        try:
+            with GameFile(settings.SAVE_PATH) as saved:
+                board = saved.board()
+                actions = list(saved.actions())
+                detector_count, started, difficulty = saved.detector_count, saved.started, saved.difficulty
+        except (OSError, ValueError) as e:
+            print("Could not load game:", e)
+            return
+
+        settings.DIFFICULTY = difficulty
+        if (board.rows, board.cols) != (settings.ROWS, settings.COLS):
+            settings.configure(rows=board.rows, cols=board.cols, mines=board.total_mines)
+            self.open_window()
+        self.new()
+        self.board = board
+        self.renderer = BoardRenderer(board)
+        self.actions = actions
+        self.detector_count = detector_count
+        self.has_left_clicked = started
+        self.update_probabilities()
+        print("Loaded game from", settings.SAVE_PATH)
 
     def events(self):
         mouse_pos = pygame.mouse.get_pos()
         self.button_hover = self.undo_button.collidepoint(mouse_pos)
+        camera = self.renderer.camera
+
+        # Arrow keys scroll the board while held.
+        keys = pygame.key.get_pressed()
+        dx = keys[pygame.K_RIGHT] - keys[pygame.K_LEFT]
+        dy = keys[pygame.K_DOWN] - keys[pygame.K_UP]
+        if dx or dy:
+            camera.pan(dx * settings.SCROLL_SPEED, dy * settings.SCROLL_SPEED)
 
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
@@ -277,11 +406,29 @@ class Game:
             if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_SPACE:
                     self.detector = not self.detector
+                if event.key == pygame.K_F5:
+                    self.save_game()
+                if event.key == pygame.K_F9:
+                    self.load_game()
+                if event.key == pygame.K_F3 and s_profile.active is not None:
+                    self.show_profile = not self.show_profile
+                if pygame.key.get_mods() & pygame.KMOD_CTRL:
+                    if event.key == pygame.K_z:
+                        self.undo()
+                    elif event.key == pygame.K_y:
+                        self.redo()
+
+            # Mouse wheel zooms around the cursor, dragging with the middle button scrolls.
+            if event.type == pygame.MOUSEWHEEL:
+                camera.zoom(event.y, mouse_pos)
+            if event.type == pygame.MOUSEMOTION and event.buttons[1]:
+                camera.pan(-event.rel[0], -event.rel[1])
                     
             modifiers = pygame.key.get_mods()
             # Bit-wise calculation
             if modifiers & pygame.KMOD_SHIFT:
                 self.is_showing_prob = not self.is_showing_prob
+                self.full_redraw = True
 
             if event.type == pygame.MOUSEBUTTONDOWN:
                 mx, my = pygame.mouse.get_pos()
@@ -290,60 +437,54 @@ class Game:
                     self.undo()
                     continue
 
+                tile_pos = camera.tile_at(mx, my)
                 if self.detector: # Detector Mode
-                    if my < settings.HEIGHT:
-                        col = mx // settings.TILESIZE
-                        row = my // settings.TILESIZE
-                        if 0 <= col < settings.COLS and 0 <= row < settings.ROWS:
-                            if event.button == 1:
-                                self.push_state()
-                                if self.detector_count > 0:
-                                    self.detector_count -= 1
-                                    self.board.reveal(row, col)
-                                    self.update_probabilities()
+                    if tile_pos is not None:
+                        row, col = tile_pos
+                        if event.button == 1:
+                            self.board.begin_move()
+                            self.actions.append((DETECT, row * self.board.cols + col))
+                            charges = 0
+                            if self.detector_count > 0:
+                                self.detector_count -= 1
+                                charges = 1
+                                self.board.reveal(row, col)
+                                self.update_probabilities()
+                            self.push_state(charges)
                 else: # Normal Mode
-                    if my < settings.HEIGHT:
-                        col = mx // settings.TILESIZE
-                        row = my // settings.TILESIZE
-                        if 0 <= col < settings.COLS and 0 <= row < settings.ROWS:
-
-                            tile = self.board.board_list[row][col]
-
-                            if event.button == 1:
-                                if self.has_left_clicked == False:
-                                    self.board.start_placing(row, col)
-                                    self.has_left_clicked = True
-
-                                self.push_state()
-                                if not tile.flagged:
-                                    if not self.board.dig(row, col):
-                                        # dug a Mine
-                                        for r in self.board.board_list:
-                                            for t in r:
-                                                if t.flagged and t.type != "X":
-                                                    t.flagged = False
-                                                    t.revealed = True
-                                                    t.image = settings.tile_not_mine
-                                                elif t.type == "X":
-                                                    t.revealed = True
-                                        self.playing = False
-                                    if self.cheat_enabled:
-                                        self.update_probabilities()
-
-                            if event.button == 3:
-                                self.push_state()
-                                if not tile.revealed:
-                                    tile.flagged = not tile.flagged
-                                    if self.cheat_enabled:
-                                        self.update_probabilities()
+                    if tile_pos is not None:
+                        row, col = tile_pos
+
+                        tile = self.board.board_list[row][col]
+
+                        if event.button == 1:
+                            if self.has_left_clicked == False:
+                                self.board.start_placing(row, col)
+                                self.has_left_clicked = True
+
+                            self.board.begin_move()
+                            self.actions.append((DIG, row * self.board.cols + col))
+                            if not tile.flagged:
+                                if not self.board.dig(row, col):
+                                    # dug a Mine
+                                    self.board.expose_mines()
+                                    self.playing = False
+                                if self.cheat_enabled:
+                                    self.update_probabilities()
+                            self.push_state()
+
+                        if event.button == 3:
+                            self.board.begin_move()
+                            self.actions.append((FLAG, row * self.board.cols + col))
+                            if self.board.toggle_flag(row, col):
+                                if self.cheat_enabled:
+                                    self.update_probabilities()
+                            self.push_state()
 
                 if self.check_win():
                     self.win = True
                     self.playing = False
-                    for r in self.board.board_list:
-                        for t in r:
-                            if not t.revealed:
-                                t.flagged = True
+                    self.board.flag_unrevealed()
 
     def end_screen(self):
         font = pygame.font.SysFont('Arial', 50)
@@ -367,7 +508,7 @@ class Game:
                         return         
 
             self.screen.fill(settings.BGCOLOUR)
-            self.board.draw(self.screen)
+            self.renderer.draw(self.screen, full=True)
 
             overlay = pygame.Surface((settings.WIDTH, settings.HEIGHT))
             overlay.set_alpha(180)
@@ -395,6 +536,30 @@ class Game:
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=settings.TITLE)
+    parser.add_argument("--rows", type=int, help=f"board rows (default {settings.ROWS})")
+    parser.add_argument("--cols", type=int, help=f"board columns (default {settings.COLS})")
+    parser.add_argument("--mines", type=int, help="mine count (default: set by the difficulty)")
+    parser.add_argument("--tile-size", type=int, help=f"tile size in pixels (default {settings.TILESIZE})")
+    parser.add_argument("--lazy", action="store_true",
+                        help="generate the board chunk by chunk as it is explored (for huge boards)")
+    parser.add_argument("--profile", nargs="?", const=s_profile.DEFAULT_TRACE, metavar="TRACE",
+                        help=f"time the game's stages into TRACE (.jsonl or .csv, default {s_profile.DEFAULT_TRACE}); "
+                             f"F3 shows a summary. Also enabled by ${s_profile.ENV_VAR}=TRACE")
+    args = parser.parse_args()
+    try:
+        settings.configure(rows=args.rows, cols=args.cols, mines=args.mines, tilesize=args.tile_size,
+                           lazy=args.lazy)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.profile or s_profile.requested():
+        s_profile.enable(args.profile)
+        s_profile.instrument(Game, "events", "events")
+        s_profile.instrument(Game, "draw", "draw")
+        s_profile.instrument(Game, "draw_probabilities", "overlay")
+        s_profile.instrument(Game, "push_state", "push_state")
+
     game = Game()
     game.main_menu()
 
@@ -0,0 +1,277 @@
+import hashlib
+import random
+import struct
+import zlib
+from collections import OrderedDict, deque
+import settings
+from s_logic import Board, TileGrid, count_adjacent, WRONG_FLAG
+
+LAZY_CHUNK = 32  # chunk side in tiles
+HOT_CHUNKS = 512  # materialized chunks kept before the coldest go to the store
+MINE_CACHE = 4096  # chunk mine layouts kept (they are cheap to regenerate)
+
+
+class Chunk:
+    """Materialized LAZY_CHUNK x LAZY_CHUNK block of a LazyBoard, one byte per cell."""
+    __slots__ = ("mines", "counts", "revealed", "flagged")
+
+    def __init__(self, mines, counts, revealed, flagged):
+        self.mines, self.counts, self.revealed, self.flagged = mines, counts, revealed, flagged
+
+
+class LazyPlane:
+    """Flat-index view (row * cols + col) of one byte plane of a LazyBoard.
+
+    Supports single-cell reads and writes, which is all the tile-level code
+    (Tile, dig, reveal, toggle_flag, undo) needs; whole-plane operations
+    are overridden by LazyBoard.
+    """
+
+    def __init__(self, board, name):
+        self.board = board
+        self.name = name
+
+    def __len__(self):
+        return self.board.rows * self.board.cols
+
+    def __getitem__(self, index):
+        chunk, local = self.board.locate(index)
+        return getattr(chunk, self.name)[local]
+
+    def __setitem__(self, index, value):
+        chunk, local = self.board.locate(index)
+        plane = getattr(chunk, self.name)
+        if self.name == "revealed" and not chunk.mines[local]:
+            self.board.revealed_safe += bool(value) - plane[local]
+        plane[local] = value
+
+
+class LazyBoard(Board):
+    """Board whose mines are generated chunk by chunk, only where play reaches.
+
+    Each LAZY_CHUNK x LAZY_CHUNK chunk gets round(density * cells) mines at
+    positions drawn from a generator seeded by hashing (seed, chunk row,
+    chunk col), so any chunk can be rebuilt on demand. A chunk is
+    materialized (mines, clue counts, revealed and flagged planes) the first
+    time a cell in it is read or written; at most HOT_CHUNKS stay
+    materialized, colder ones are compressed into self.store if the player
+    changed them and dropped otherwise. Startup is O(1) and memory follows
+    the explored area, so rows and cols can be huge.
+
+    The mine, count, revealed and flagged planes are LazyPlane views, so the
+    tile-level Board code works unchanged. Whole-board operations (bulk
+    save/load, the probability solver) are not supported.
+    """
+
+    def __init__(self, rows=None, cols=None, density=None, seed=None):
+        self.rows = settings.ROWS if rows is None else rows
+        self.cols = settings.COLS if cols is None else cols
+        self.density = settings.get_mine_amount() / (self.rows * self.cols) if density is None else density
+        self.seed = random.randrange(2 ** 63) if seed is None else seed
+        self.rng = random.Random(self.seed)
+
+        self.hot = OrderedDict()  # chunk key -> Chunk, least recently used first
+        self.store = {}  # chunk key -> zlib-compressed revealed + flagged planes of evicted chunks
+        self.mine_cache = OrderedDict()  # chunk key -> mine bytes, least recently used first
+        self.safe_cells = set()  # flat indices kept free of mines (the first click's 3x3)
+        self.ended = None  # "lost" / "won" once the game is over; applied to chunks as they load
+        self.revealed_safe = 0  # revealed tiles that are not mines
+
+        self.mines = LazyPlane(self, "mines")
+        self.counts = LazyPlane(self, "counts")
+        self.revealed = LazyPlane(self, "revealed")
+        self.flagged = LazyPlane(self, "flagged")
+        self.marks = {}  # cell index -> EXPLODED / WRONG_FLAG
+
+        self.total_mines = self.mines_in_board()
+        self.board_list = TileGrid(self)
+        self.dirty_tiles = set()
+        self.epoch = 0
+        self.journal = None
+        self.neighbours = None  # a table would be O(cols); see neighbour_indices
+        self.engine = None  # the solver needs whole-board planes
+
+    def mines_in_board(self):
+        """Mines the chunk generator places on the whole board, before the safe zone is cleared."""
+        size = LAZY_CHUNK
+        full_rows, edge_rows = divmod(self.rows, size)
+        full_cols, edge_cols = divmod(self.cols, size)
+        total = 0
+        for chunk_rows, height in ((full_rows, size), (1 if edge_rows else 0, edge_rows)):
+            for chunk_cols, width in ((full_cols, size), (1 if edge_cols else 0, edge_cols)):
+                total += chunk_rows * chunk_cols * round(self.density * height * width)
+        return total
+
+    # Chunks
+
+    def chunk_seed(self, key):
+        digest = hashlib.blake2b(struct.pack("<qqq", self.seed & (2 ** 63 - 1), *key), digest_size=8).digest()
+        return int.from_bytes(digest, "little")
+
+    def chunk_mines(self, key):
+        """Mine bytes of chunk key (row-major LAZY_CHUNK x LAZY_CHUNK), regenerated as needed."""
+        mines = self.mine_cache.get(key)
+        if mines is not None:
+            self.mine_cache.move_to_end(key)
+            return mines
+        size = LAZY_CHUNK
+        mines = bytearray(size * size)
+        r0, c0 = key[0] * size, key[1] * size
+        if 0 <= r0 < self.rows and 0 <= c0 < self.cols:
+            height, width = min(size, self.rows - r0), min(size, self.cols - c0)
+            rng = random.Random(self.chunk_seed(key))
+            for rank in rng.sample(range(height * width), round(self.density * height * width)):
+                r, c = divmod(rank, width)
+                if (r0 + r) * self.cols + c0 + c not in self.safe_cells:
+                    mines[r * size + c] = 1
+        self.mine_cache[key] = mines
+        if len(self.mine_cache) > MINE_CACHE:
+            self.mine_cache.popitem(last=False)
+        return mines
+
+    def chunk(self, key):
+        """Materialized Chunk for key, loading or building it if needed."""
+        chunk = self.hot.get(key)
+        if chunk is not None:
+            self.hot.move_to_end(key)
+            return chunk
+
+        size = LAZY_CHUNK
+        mines = self.chunk_mines(key)
+        # Clues need the mines of the eight surrounding chunks along the border.
+        halo = bytearray((size + 2) * (size + 2))
+        for dr in (-1, 0, 1):
+            for dc in (-1, 0, 1):
+                other = mines if dr == dc == 0 else self.chunk_mines((key[0] + dr, key[1] + dc))
+                rows = range(size) if dr == 0 else [size - 1] if dr < 0 else [0]
+                cols = range(size) if dc == 0 else [size - 1] if dc < 0 else [0]
+                for r in rows:
+                    hr = r + 1 + dr * size  # row in the halo grid
+                    for c in cols:
+                        halo[hr * (size + 2) + c + 1 + dc * size] = other[r * size + c]
+        padded = count_adjacent(halo, size + 2, size + 2)
+        counts = bytearray(b"".join(padded[(r + 1) * (size + 2) + 1:(r + 2) * (size + 2) - 1] for r in range(size)))
+
+        stored = self.store.pop(key, None)
+        if stored is None:
+            revealed, flagged = bytearray(size * size), bytearray(size * size)
+        else:
+            planes = zlib.decompress(stored)
+            revealed, flagged = bytearray(planes[:size * size]), bytearray(planes[size * size:])
+        chunk = self.hot[key] = Chunk(mines, counts, revealed, flagged)
+        if self.ended:
+            self.finish_chunk(key, chunk)
+
+        if len(self.hot) > HOT_CHUNKS:
+            self.evict(*self.hot.popitem(last=False))
+        return chunk
+
+    def evict(self, key, chunk):
+        """Move a cold chunk to the store, or forget it if the player never touched it."""
+        if any(chunk.revealed) or any(chunk.flagged):
+            self.store[key] = zlib.compress(bytes(chunk.revealed) + bytes(chunk.flagged))
+
+    def locate(self, index):
+        """(Chunk, index inside the chunk) of a flat board index."""
+        row, col = divmod(index, self.cols)
+        chunk = self.chunk((row // LAZY_CHUNK, col // LAZY_CHUNK))
+        return chunk, (row % LAZY_CHUNK) * LAZY_CHUNK + col % LAZY_CHUNK
+
+    def chunk_cells(self, key):
+        """Flat board indices of the cells of chunk key with their index inside the chunk."""
+        size = LAZY_CHUNK
+        r0, c0 = key[0] * size, key[1] * size
+        for r in range(r0, min(r0 + size, self.rows)):
+            for c in range(c0, min(c0 + size, self.cols)):
+                yield r * self.cols + c, (r - r0) * size + c - c0
+
+    # Board overrides
+
+    def start_placing(self, ex_row, ex_col):
+        self.place_mines(ex_row, ex_col)
+
+    def place_mines(self, ex_row, ex_col):
+        """Keep the 3x3 around the first click free of mines; the rest is generated per chunk."""
+        zone = self.neighbour_indices(ex_row * self.cols + ex_col, include_self=True)
+        self.total_mines -= sum(self.mines[index] for index in zone)
+        for key, chunk in list(self.hot.items()):
+            self.evict(key, chunk)  # keep flags placed before the first click
+        self.hot.clear()
+        self.mine_cache.clear()
+        self.safe_cells.update(zone)
+        self.redraw_all()
+
+    def place_clues(self):
+        pass  # clues are counted per chunk when it is materialized
+
+    def neighbour_indices(self, index, include_self=False):
+        """Board.neighbour_indices without the per-size table, which would not fit huge boards."""
+        row, col = divmod(index, self.cols)
+        cols = self.cols
+        return [(row + dr) * cols + col + dc for dr in (-1, 0, 1) if 0 <= row + dr < self.rows
+                for dc in (-1, 0, 1) if 0 <= col + dc < cols and (include_self or dr or dc)]
+
+    def changed(self, indices):
+        self.dirty_tiles.update(indices)
+
+    def flood(self, row, col):
+        """Reveal (row, col) and, from an empty tile, the empty region around it, tile by tile."""
+        start = row * self.cols + col
+        if self.revealed[start] or self.flagged[start]:
+            return []
+        self.revealed[start] = 1
+        opened = [start]
+        if not self.mines[start] and not self.counts[start]:
+            queue = deque([start])
+            while queue:
+                for index in self.neighbour_indices(queue.popleft()):
+                    if self.revealed[index] or self.flagged[index]:
+                        continue
+                    self.revealed[index] = 1
+                    opened.append(index)
+                    if not self.counts[index]:
+                        queue.append(index)
+        if self.journal is not None:
+            for index in opened:
+                self.journal.setdefault(index, 0)  # flood only opens covered, unflagged tiles
+        self.changed(opened)
+        return opened
+
+    def finish_chunk(self, key, chunk):
+        """Apply the end of the game to one chunk: show mines and wrong flags, or flag what is left."""
+        for index, local in self.chunk_cells(key):
+            if self.ended == "lost":
+                if chunk.mines[local]:
+                    chunk.revealed[local] = 1
+                elif chunk.flagged[local]:
+                    chunk.flagged[local] = 0
+                    chunk.revealed[local] = 1
+                    self.revealed_safe += 1
+                    self.marks[index] = WRONG_FLAG
+            elif not chunk.revealed[local]:
+                chunk.flagged[local] = 1
+
+    def expose_mines(self):
+        self.ended = "lost"
+        for key, chunk in list(self.hot.items()):
+            self.finish_chunk(key, chunk)
+        self.redraw_all()
+
+    def flag_unrevealed(self):
+        self.ended = "won"
+        for key, chunk in list(self.hot.items()):
+            self.finish_chunk(key, chunk)
+        self.redraw_all()
+
+    def check_win(self):
+        return self.revealed_safe == self.rows * self.cols - self.total_mines
+
+    def save_state(self):
+        raise NotImplementedError("lazy boards have no whole-board state")
+
+    load_state = sync_state = save_state
+
+    def probabilities(self, **options):
+        raise NotImplementedError("the probability solver needs a finite, fully generated board")
+
+    probability_grid = probability_estimate = probabilities
@@ -1,87 +1,599 @@
 import random
 import math
-import pygame
+import re
+import time
+import heapq
+from bisect import bisect_right
+from collections import deque
+from array import array
+from functools import lru_cache
+from itertools import compress
 import settings   # MUST import module, not values
+from s_solver import (propagate, split_components, enumerate_component, count_component, combine_components,
+                      IslandSampler, SolveCancelled, patterns)
+
+ZERO_RUN = re.compile(b"\x00+")  # run of zero bytes, used to scan rows of the counts grid
+ENUMERATE_UP_TO = 12  # exact islands up to this size are enumerated; the DP is faster on larger ones
+
+# Board.marks values: how a revealed tile is shown instead of its plain image
+EXPLODED = "exploded"  # the mine that ended the game
+WRONG_FLAG = "wrong_flag"  # a flag that was on a safe tile
+
+
+@lru_cache(maxsize=16)
+def neighbour_table(rows, cols):
+    """Flat-index neighbour offsets for a rows x cols board, clipped at the edges.
+
+    Every row but the first and last has the same neighbours relative to the
+    cell index, so the table is indexed [include_self][row class][col], with
+    row class 0 for the first row, 2 for the last and 1 for the rest (see
+    Board.neighbour_indices). Each entry is a tuple of offsets in row-major
+    order; memory is O(cols) whatever the board height.
+    """
+    table = ([], [])
+    for r in (0, min(1, rows - 1), rows - 1):
+        drs = [dr for dr in (-1, 0, 1) if 0 <= r + dr < rows]
+        for include_self in (False, True):
+            table[include_self].append([
+                tuple(dr * cols + dc for dr in drs for dc in (-1, 0, 1)
+                      if 0 <= c + dc < cols and (include_self or dr or dc))
+                for c in range(cols)])
+    return table
+
+
+@lru_cache(maxsize=None)
+def optional_numpy():
+    """The numpy module, or None if it is not installed.
+
+    NumPy is optional and only speeds up a few whole-board operations, so it
+    is imported on first use rather than when the game starts.
+    """
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def count_adjacent(mines, rows, cols):
+    """Return a bytearray with the number of mines around each safe cell.
+
+    mines is a flat rows * cols grid of 0/1 bytes; mine cells get 0. This is
+    a padded 3x3 neighbour sum done in one pass: with NumPy as nine shifted
+    slices of the padded grid, otherwise with the padded grid read as one big
+    integer (one byte per cell) and added to eight shifted copies of itself.
+    Sums never exceed 9, so no byte carries into its neighbour.
+    """
+    np = optional_numpy()
+    if np is not None:
+        grid = np.frombuffer(bytes(mines), dtype=np.uint8).reshape(rows, cols)
+        padded = np.pad(grid, 1)
+        total = sum(padded[dr:dr + rows, dc:dc + cols] for dr in range(3) for dc in range(3))
+        total[grid == 1] = 0
+        return bytearray(total.astype(np.uint8).tobytes())
+
+    width = cols + 2  # padded row width
+    pad_row = bytes(width)
+    padded = b"".join([pad_row] + [b"\0" + bytes(mines[r * cols:(r + 1) * cols]) + b"\0" for r in range(rows)]
+                      + [pad_row])
+    size = len(padded)
+    grid = int.from_bytes(padded, "big")
+    total = 0
+    for offset in (-width - 1, -width, -width + 1, -1, 0, 1, width - 1, width, width + 1):
+        # Big-endian: the byte offset cells later sits 8 * offset bits lower.
+        total += grid << (8 * offset) if offset > 0 else grid >> (-8 * offset)
+    total &= (1 << (8 * size)) - 1
+    total &= ~(grid * 0xFF)  # zero the mine cells
+    counts = total.to_bytes(size, "big")
+    return bytearray(b"".join(counts[(r + 1) * width + 1:(r + 2) * width - 1] for r in range(rows)))
+
 
 class Tile:
-    def __init__(self, x, y, image, type, revealed=False, flagged=False):
-        self.x, self.y = x * settings.TILESIZE, y * settings.TILESIZE
-        self.image = image
-        self.type = type
-        self.revealed = revealed
-        self.flagged = flagged
+    """View of one cell of a Board.
+
+    The cell state lives in the Board's flat byte grids; a Tile only holds the
+    board and the cell position and maps type/revealed/flagged/image onto that
+    state, so tiles can be created on demand and thrown away.
+    """
+    __slots__ = ("board", "row", "col", "index")
+
+    def __init__(self, board, row, col):
+        self.board = board
+        self.row, self.col = row, col
+        self.index = row * board.cols + col
+
+    @property
+    def x(self):
+        return self.col * settings.TILESIZE
+
+    @property
+    def y(self):
+        return self.row * settings.TILESIZE
+
+    @property
+    def type(self):
+        if self.board.mines[self.index]:
+            return "X"
+        return "C" if self.board.counts[self.index] else "."
+
+    @type.setter
+    def type(self, value):
+        self.board.mines[self.index] = value == "X"
+
+    @property
+    def revealed(self):
+        return bool(self.board.revealed[self.index])
+
+    @revealed.setter
+    def revealed(self, value):
+        self.board.revealed[self.index] = bool(value)
+        self.board.dirty_tiles.add(self.index)
+
+    @property
+    def flagged(self):
+        return bool(self.board.flagged[self.index])
+
+    @flagged.setter
+    def flagged(self, value):
+        self.board.flagged[self.index] = bool(value)
+        self.board.dirty_tiles.add(self.index)
+
+    @property
+    def image(self):
+        """Image for the revealed tile, from the assets loaded by settings.load_assets()."""
+        mark = self.board.marks.get(self.index)
+        if mark == EXPLODED:
+            return settings.tile_exploded
+        if mark == WRONG_FLAG:
+            return settings.tile_not_mine
+        if self.board.mines[self.index]:
+            return settings.tile_mine
+        number = self.board.counts[self.index]
+        return settings.tile_numbers[number - 1] if number else settings.tile_empty
+
+    @property
+    def face(self):
+        """Image the tile shows right now: its image once revealed, else flag or covered."""
+        if self.revealed:
+            return self.image
+        return settings.tile_flag if self.flagged else settings.tile_unknown
 
     def draw(self, board_surface):
-        if not self.flagged and self.revealed:
-            board_surface.blit(self.image, (self.x, self.y))
-        elif self.flagged and not self.revealed:
-            board_surface.blit(settings.tile_flag, (self.x, self.y))
-        elif not self.revealed:
-            board_surface.blit(settings.tile_unknown, (self.x, self.y))
+        board_surface.blit(self.face, (self.x, self.y))
 
     def __repr__(self):
         return self.type
 
 
-class Board:
-    def __init__(self):
-        self.board_surface = pygame.Surface((settings.WIDTH, settings.HEIGHT))
-        self.board_list = [
-            [Tile(col, row, settings.tile_empty, ".") for col in range(settings.COLS)]
-            for row in range(settings.ROWS)
-        ]
+class Move:
+    """Tiles changed by one player action, for undo/redo.
+
+    indices lists the changed tiles; before/after hold one byte per tile
+    (bit 0 revealed, bit 1 flagged). charges is the number of detector
+    charges the action used.
+    """
+    __slots__ = ("indices", "before", "after", "charges")
+
+    def __init__(self, indices, before, after, charges=0):
+        self.indices = indices
+        self.before = before
+        self.after = after
+        self.charges = charges
+
+    def __len__(self):
+        return len(self.indices)
+
+
+class TileRow:
+    """Sequence of Tile views over one board row."""
+
+    def __init__(self, board, row):
+        self.board = board
+        self.row = row
+
+    def __len__(self):
+        return self.board.cols
+
+    def __getitem__(self, col):
+        if not 0 <= col < self.board.cols:
+            raise IndexError(col)
+        return Tile(self.board, self.row, col)
+
+    def __iter__(self):
+        for col in range(self.board.cols):
+            yield Tile(self.board, self.row, col)
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+class TileGrid:
+    """board_list compatible view: grid[row][col] -> Tile."""
+
+    def __init__(self, board):
+        self.board = board
+
+    def __len__(self):
+        return self.board.rows
 
-        self.dug = []
+    def __getitem__(self, row):
+        if not 0 <= row < self.board.rows:
+            raise IndexError(row)
+        return TileRow(self.board, row)
+
+    def __iter__(self):
+        for row in range(self.board.rows):
+            yield TileRow(self.board, row)
+
+
+class ProbabilityEngine:
+    """Stateful mine-probability solver attached to a Board.
+
+    The engine keeps the clue constraints, flag set and island solutions
+    between moves. Board mutations report the cells they changed through
+    touch(); the next solve only rebuilds the constraints of clues around
+    those cells and only re-enumerates islands whose constraints differ from
+    the previous solve. Small islands that do need solving are looked up by
+    shape in the process-wide pattern cache first. Call reset() after
+    replacing the board state wholesale (mine placement, undo).
+    """
+
+    def __init__(self, board):
+        self.board = board
+        self.patterns = patterns  # island shapes solved by any engine, see s_solver.PatternCache
+        self.reset()
+
+    def reset(self):
+        """Rebuild every index from the board planes.
+
+        Only the boundary clues (revealed safe tiles next to a covered tile or
+        a revealed mine) get a constraint, and they are found with byte-level
+        operations, so the Python work is O(boundary), not O(board).
+        """
+        board = self.board
+        size = board.rows * board.cols
+        self.shown = bytearray(board.revealed)  # the engine's copy of the revealed plane, to spot changes
+        self.revealed_count = self.shown.count(1)  # revealed tiles
+        # 0/1 bytes: AND/XOR of the planes as big integers work cell by cell.
+        ones = int.from_bytes(b"\x01" * size, "big")
+        revealed, mines = int.from_bytes(board.revealed, "big"), int.from_bytes(board.mines, "big")
+        self.revealed_mines = (revealed & mines).bit_count()  # mines already revealed (usually after game-over)
+        self.flagged = {divmod(index, board.cols) for index in compress(range(size), board.flagged)}  # set[(r,c)]
+        self.constraints = {}  # clue (r,c) -> (tiles, required) for clues with unknown neighbours
+        self.broken = set()  # set[(r,c)] clues contradicted by the flags around them
+        self.solutions = {}  # island signature -> solved Island (or IslandSampler)
+        self.errors = None  # (half-widths, outside half-width) of the last sampled solve, else None
+        self.dirty = set()  # indices of tiles changed since the last solve
+        self.result = None  # (options, (probs, outside_prob)) of the last exact solve, until the board changes
+        self.stats = {}  # counters of the last solve, for profiling (see s_profile)
+
+        # Revealed safe tiles with a covered or mine neighbour: count the
+        # "not revealed safe" cells around every cell (count_adjacent zeroes
+        # the cells that are themselves not revealed safe).
+        others = (ones ^ (revealed & (ones ^ mines))).to_bytes(size, "big")
+        for index in compress(range(size), count_adjacent(others, board.rows, board.cols)):
+            self.update_clue(*divmod(index, board.cols))
+
+    def touch(self, row, col):
+        """Mark a tile whose revealed/flagged state has changed."""
+        self.dirty.add(row * self.board.cols + col)
+
+    def touch_many(self, indices):
+        """touch() for many tiles given as flat indices."""
+        self.dirty.update(indices)
+
+    def refresh(self):
+        """Fold the dirty tiles into the indexes and rebuild the clues around them."""
+        if not self.dirty:
+            return
+
+        self.result = None
+        board = self.board
+        shown = self.shown
+        clues = set()  # revealed tiles whose constraint may have changed
+        for index in self.dirty:
+            r, c = divmod(index, board.cols)
+            if board.flagged[index]:
+                self.flagged.add((r, c))
+            else:
+                self.flagged.discard((r, c))
+
+            now = board.revealed[index]
+            if now != shown[index]:
+                shown[index] = now
+                step = 1 if now else -1
+                self.revealed_count += step
+                if board.mines[index]:
+                    self.revealed_mines += step
+
+            clues.update(board.neighbour_indices(index, include_self=True))
+        self.dirty.clear()
+
+        cols = board.cols
+        for index in clues:
+            self.update_clue(*divmod(index, cols))
+
+    def update_clue(self, r, c):
+        """Recompute the constraint (or broken state) of the clue at (r, c)."""
+        board = self.board
+        self.constraints.pop((r, c), None)
+        self.broken.discard((r, c))
+        index = r * board.cols + c
+        if not board.revealed[index] or board.mines[index]:
+            return
+
+        number = board.counts[index]  # visible clue number for this revealed safe tile
+        flagged_nei = 0  # flagged neighbours around this revealed tile
+        unknown_nei = []  # unrevealed & unflagged neighbours around this revealed tile
+        for neighbour in board.neighbour_indices(index):
+            if board.flagged[neighbour]:
+                flagged_nei += 1
+            elif not board.revealed[neighbour]:
+                unknown_nei.append(divmod(neighbour, board.cols))
+
+        required = number - flagged_nei  # mines that must be in unknown_nei to satisfy this clue
+        if required < 0 or (not unknown_nei and required != 0):
+            # Flags contradict the visible number.
+            self.broken.add((r, c))
+        elif unknown_nei:
+            self.constraints[(r, c)] = (tuple(unknown_nei), required)
+
+    def probabilities(self, *, max_frontier_exact=32, max_solutions_cap=5000, exact=True, time_budget=None,
+                      cancelled=None):
+        """See Board.probabilities and Board.probability_estimate.
+
+        Exact results are kept until the board changes, so asking again
+        (e.g. from Board.best_moves) costs nothing; callers must not modify
+        the returned dict.
+        """
+        self.refresh()
+        board = self.board
+        self.errors = None
+        options = (max_frontier_exact, max_solutions_cap, exact)
+        if time_budget is None and self.result is not None and self.result[0] == options:
+            return self.result[1]
+
+        if self.broken:
+            return {}, 0.0
+
+        total_mines = board.total_mines  # total mines for the chosen difficulty
+        remaining_mines = total_mines - len(self.flagged) - self.revealed_mines  # mines not accounted for yet
+        if remaining_mines < 0:
+            remaining_mines = 0
+
+        unknown_count = board.rows * board.cols - self.revealed_count - len(self.flagged)  # unrevealed & unflagged
+
+        constrained = {pos for tiles, _ in self.constraints.values() for pos in tiles}  # constrained unknowns
+        outside_count = unknown_count - len(constrained)  # unknowns not constrained by any clue
+
+        # Settle the tiles the clues force on their own; only the rest is searched.
+        propagated = propagate(self.constraints.values())
+        if cancelled is not None and cancelled():
+            raise SolveCancelled
+        if propagated is None:
+            forced, leftover = {}, list(self.constraints.values())  # contradiction: falls back below
+        else:
+            forced, leftover = propagated
+        forced_mines = sum(forced.values())  # mines placed by forced tiles
+
+        frontier = sorted({pos for tiles, _ in leftover for pos in tiles})  # undecided constrained unknowns
+        frontier_index = {pos: i for i, pos in enumerate(frontier)}  # map tile -> variable index
+
+        constraints = [([frontier_index[pos] for pos in tiles], req)
+                       for tiles, req in leftover if tiles]  # list[(idxs, required)]
+
+        components = split_components(len(frontier), constraints)  # independent islands of the frontier
+        islands = []  # solved islands, in the order of components
+        solutions = {}  # island signatures used by this solve
+        fresh = []  # islands solved by this call rather than reused
+        for variables, cons in components:
+            if cancelled is not None and cancelled():
+                raise SolveCancelled  # solutions kept so far stay valid for the next solve
+            if len(variables) <= max_frontier_exact:
+                # Small island: list every assignment, or count them by DP once that is faster.
+                mode = None if len(variables) <= ENUMERATE_UP_TO else "count"
+            elif time_budget is not None:
+                mode = "sample"  # large island: random walks until the time budget is spent
+            elif exact:
+                mode = "count"  # large island: exact DP over mine counts
+            else:
+                mode = max_solutions_cap  # large island: capped enumeration
+            signature = (mode, tuple(sorted((tuple(frontier[variables[v]] for v in idxs), req)
+                                            for idxs, req in cons)))
+            island = self.solutions.get(signature)
+            if island is None:
+                if mode == "count":
+                    island = count_component(len(variables), cons, cancelled)
+                elif mode == "sample":
+                    island = IslandSampler(len(variables), cons)
+                elif mode is None:
+                    island = self.patterns.island([frontier[v] for v in variables], cons)
+                else:
+                    island = enumerate_component(len(variables), cons, mode)
+                fresh.append(island)
+            solutions[signature] = island
+            islands.append(island)
+        self.solutions = solutions  # drop islands that no longer exist
+        solved = [island for island in fresh if not isinstance(island, IslandSampler)]
+        self.stats = {
+            "frontier": len(frontier),  # undecided constrained tiles
+            "forced": len(forced),  # tiles the clues settle on their own
+            "components": len(components),
+            "solved": len(fresh),  # islands not found in the cache
+            "nodes": sum(island.nodes for island in solved),
+            "solutions": sum(sum(island.poly) for island in solved),
+            "capped": any(island.capped for island in solved),
+        }
+
+        # Samplers keep their walks across calls, so repeated estimates of the
+        # same position keep refining. At least two batches are needed for an error.
+        samplers = [i for i, island in enumerate(islands) if isinstance(island, IslandSampler)]
+        if samplers:
+            deadline = time.perf_counter() + time_budget
+            while True:
+                for i in samplers:
+                    islands[i].run_batch()
+                if cancelled is not None and cancelled():
+                    raise SolveCancelled
+                if time.perf_counter() >= deadline and min(len(islands[i].batches) for i in samplers) >= 2:
+                    break
+            sampled = islands
+            islands = [island.island() if i in samplers else island for i, island in enumerate(sampled)]
+
+        result = None
+        if propagated is not None:
+            result = combine_components(islands, remaining_mines - forced_mines, outside_count, cancelled)
+        if result is None:
+            # No consistent assignments (usually due to incorrect flags), or no
+            # constraints at all: every unknown tile gets the same base rate.
+            base = (remaining_mines / unknown_count) if unknown_count else 0.0
+            island_probs, outside_prob = [[base] * len(v) for v, _ in components], base
+            forced = dict.fromkeys(forced, base)
+        else:
+            island_probs, outside_prob = result
+
+        probs = dict.fromkeys(self.flagged, 1.0)  # output P(mine) of every tile that differs from outside_prob
+        for pos, value in forced.items():
+            probs[pos] = float(value)
+        for (variables, _), var_probs in zip(components, island_probs):
+            for v, p in zip(variables, var_probs):
+                probs[frontier[v]] = p
+
+        if samplers and result is not None:
+            self.errors = self.batch_errors(sampled, samplers, components, frontier, forced,
+                                            remaining_mines - forced_mines, outside_count)
+        if time_budget is None:
+            self.result = (options, (probs, outside_prob))
+        return probs, outside_prob
+
+    def batch_errors(self, sampled, samplers, components, frontier, forced, remaining_mines, outside_count,
+                     groups=20):
+        """95% confidence half-widths for a sampled solve, by batch means.
+
+        The batches of every sampler are split into up to groups groups; each
+        group is combined on its own and the spread of the group estimates
+        gives the standard error of their mean. Returns the half-widths in the
+        same sparse form as probabilities().
+        """
+        count = min(groups, min(len(sampled[i].batches) for i in samplers))
+        estimates = []  # per group: (island probabilities, outside probability)
+        for g in range(count):
+            islands = []
+            for i, island in enumerate(sampled):
+                if i in samplers:
+                    batches = island.batches
+                    island = island.island(batches[g * len(batches) // count:(g + 1) * len(batches) // count])
+                islands.append(island)
+            result = combine_components(islands, remaining_mines, outside_count)
+            if result is not None:
+                estimates.append(result)
+
+        def half_width(values):
+            if len(values) < 2:
+                return 1.0  # no spread to measure: anything is possible
+            mean = sum(values) / len(values)
+            variance = sum((x - mean) ** 2 for x in values) / (len(values) - 1)
+            return 1.96 * math.sqrt(variance / len(values))
+
+        errors = dict.fromkeys(self.flagged, 0.0)  # half-width of every tile that differs from outside
+        errors.update(dict.fromkeys(forced, 0.0))
+        for ci, (variables, _) in enumerate(components):
+            for vi, v in enumerate(variables):
+                errors[frontier[v]] = half_width([probabilities[ci][vi] for probabilities, _ in estimates])
+        return errors, half_width([outside_prob for _, outside_prob in estimates])
+
+
+class Board:
+    """Minesweeper board state.
+
+    The core state is four flat byte grids indexed by row * cols + col:
+    mines (1 = mine), counts (adjacent mines, filled by place_clues),
+    revealed and flagged. board_list is a TileGrid view on top of that state
+    and marks flags revealed tiles shown specially (EXPLODED, WRONG_FLAG).
+
+    The board is pure logic and never imports pygame; s_render.BoardRenderer
+    draws it and dirty_tiles tells the renderer which tiles changed. Changes
+    to the whole board bump epoch instead, so huge boards never need a set
+    of every index.
+    """
+
+    def __init__(self, rows=None, cols=None, mines=None, seed=None):
+        self.rows = settings.ROWS if rows is None else rows
+        self.cols = settings.COLS if cols is None else cols
+        self.total_mines = settings.get_mine_amount() if mines is None else mines
+        # Every board gets a seed so any game can be regenerated exactly.
+        self.seed = random.randrange(2 ** 63) if seed is None else seed
+        self.rng = random.Random(self.seed)
+        size = self.rows * self.cols
+        self.mines = bytearray(size)
+        self.counts = bytearray(size)
+        self.revealed = bytearray(size)
+        self.flagged = bytearray(size)
+        self.marks = {}  # cell index -> EXPLODED / WRONG_FLAG
+
+        self.board_list = TileGrid(self)
+        self.dirty_tiles = set()  # indices changed since the renderer last drew them
+        self.epoch = 0  # bumped by redraw_all(); renderers drop their cached tiles when it changes
+        self.journal = None  # index -> state before the current move, while one is recorded
+
+        self.neighbours = neighbour_table(self.rows, self.cols)  # shared per board size
+        # Created by the first probabilities() call. The game solves a mirror
+        # board on the probability worker, so its own board never keeps one.
+        self.engine = None
+
+    def reset_engine(self):
+        """Rebuild the engine's indexes after the board state was replaced wholesale."""
+        if self.engine is not None:
+            self.engine.reset()
 
     def start_placing(self, ex_row, ex_col):
         self.place_mines(ex_row, ex_col)
         self.place_clues()
+        self.reset_engine()
 
 
     def place_mines(self, ex_row, ex_col):
-        mines_to_place = settings.get_mine_amount()
-        print("Placing mines:", mines_to_place)  # DEBUG
+        """Place total_mines mines anywhere but the 3x3 around the first click.
 
-        placed = 0
-        while placed < mines_to_place:
-            row = random.randint(0, settings.ROWS - 1)
-            col = random.randint(0, settings.COLS - 1)
+        Mines are drawn without replacement from the allowed cell indices, so
+        the cost is O(mines) whatever the density. The draw uses self.rng and
+        is reproducible from self.seed.
+        """
+        mines_to_place = self.total_mines
+
+        safe_zone = self.neighbour_indices(ex_row * self.cols + ex_col, include_self=True)  # sorted
+        allowed = self.rows * self.cols - len(safe_zone)  # cells outside the first-click safe zone
+        if mines_to_place > allowed:
+            raise ValueError(f"cannot place {mines_to_place} mines in {allowed} free cells")
 
-            if not (abs(ex_row - row) < 2 and abs(ex_col - col) < 2) and self.board_list[row][col].type == ".":
-                self.board_list[row][col].image = settings.tile_mine
-                self.board_list[row][col].type = "X"
-                placed += 1
+        for index in self.rng.sample(range(allowed), mines_to_place):
+            # Map the rank among allowed cells back to a board index by skipping the safe zone.
+            for skipped in safe_zone:
+                if index < skipped:
+                    break
+                index += 1
+            self.mines[index] = 1
 
     def place_clues(self):
-        for row in range(settings.ROWS):
-            for col in range(settings.COLS):
-                if self.board_list[row][col].type != "X":
-                    total_mines = self.check_neighbours(row, col)
-                    if total_mines > 0:
-                        self.board_list[row][col].image = settings.tile_numbers[total_mines - 1]
-                        self.board_list[row][col].type = "C"
-
-    @staticmethod
-    def is_inside(row, col):
-        return 0 <= row < settings.ROWS and 0 <= col < settings.COLS
+        self.counts[:] = count_adjacent(self.mines, self.rows, self.cols)
+
+    def is_inside(self, row, col):
+        return 0 <= row < self.rows and 0 <= col < self.cols
 
     def check_neighbours(self, row, col):
-        total_mines = 0
-        for ro in range(-1, 2):
-            for co in range(-1, 2):
-                nr, nc = row + ro, col + co
-                if self.is_inside(nr, nc) and self.board_list[nr][nc].type == "X":
-                    total_mines += 1
-        return total_mines
+        mines = self.mines
+        return sum(mines[index] for index in self.neighbour_indices(row * self.cols + col, include_self=True))
+
+    def neighbour_indices(self, index, include_self=False):
+        """Flat indices of the cells around index (and index itself if include_self), in row-major order."""
+        row, col = divmod(index, self.cols)
+        row_class = 0 if row == 0 else 2 if row == self.rows - 1 else 1
+        return [index + offset for offset in self.neighbours[include_self][row_class][col]]
 
     def iter_neighbours(self, row, col, include_self=False):
-        for ro in range(-1, 2):
-            for co in range(-1, 2):
-                if not include_self and ro == 0 and co == 0:
-                    continue
-                nr, nc = row + ro, col + co
-                if self.is_inside(nr, nc):
-                    yield nr, nc
+        """(row, col) of the cells around a cell, in row-major order."""
+        cols = self.cols
+        return [divmod(index, cols) for index in self.neighbour_indices(row * cols + col, include_self)]
 
     def get_revealed_number(self, row, col) -> int:
         """Return the visible number for a revealed safe tile.
@@ -90,251 +602,386 @@ class Board:
         - type "C" (clue) => number is 1..8
         - type "." (empty) => number is 0
 
-        The number isn't stored directly, so we derive it using the same mine
-        counting used to assign clue images.
+        The number is the adjacency count stored by place_clues.
         """
-        t = self.board_list[row][col]
-        if t.type == "C":
-            return self.check_neighbours(row, col)
-        return 0
+        index = row * self.cols + col
+        if self.mines[index]:
+            return 0
+        return self.counts[index]
 
-    def probability_grid(self, *, max_frontier_exact=25, max_solutions_cap=5000):
-        """Compute a ROWS x COLS grid with P(tile is a mine) from revealed clues.
+    def probabilities(self, *, max_frontier_exact=32, max_solutions_cap=5000, exact=True, time_budget=None,
+                      cancelled=None):
+        """Compute P(tile is a mine) from revealed clues, sparsely.
+
+        Returns (probs, outside_prob): probs maps (r, c) to the probability
+        of every flagged tile (1.0) and every covered tile next to a clue;
+        every other covered tile has probability outside_prob. The cost
+        follows the frontier, not the board; probability_grid() expands the
+        result to a full grid.
 
         Core idea: each revealed safe tile gives a constraint:
             sum(unknown neighbour mines) == (visible_number - flagged_neighbours)
 
         Solve constraints on the *frontier* (unknown tiles adjacent to revealed
-        safe tiles) by enumerating consistent mine/no-mine assignments.
+        safe tiles) by enumerating consistent mine/no-mine assignments. The
+        frontier is first split into independent islands (no shared clue), so
+        each island is solved on its own and the per-island mine-count
+        histograms are combined afterwards.
+
+        Islands with at most max_frontier_exact tiles are always solved
+        exactly: enumerated up to ENUMERATE_UP_TO tiles, counted by dynamic
+        programming over mine counts (see s_solver.CountedIsland) beyond.
+        Larger islands are counted too; with exact=False they are enumerated
+        instead, stopping after max_solutions_cap solutions, which is faster
+        but biased toward the first branches tried. With time_budget they are
+        sampled instead (see probability_estimate).
 
         To respect the global mine count, each frontier assignment is weighted by
         the number of ways to place the remaining mines in the unconstrained
         outside region.
 
-        - Revealed safe tiles return 0.0
-        - Flagged tiles return 1.0 (treated as mines during inference)
-        """
-
-        flagged = set()  # set[(r,c)] tiles flagged as mines by the player
-        revealed_mines = 0  # count of mines already revealed (usually after game-over)
-        for r in range(settings.ROWS):
-            for c in range(settings.COLS):
-                t = self.board_list[r][c]
-                if t.flagged:
-                    flagged.add((r, c))
-                if t.revealed and t.type == "X":
-                    revealed_mines += 1
-
+        The work is done by self.engine, created on the first call, which keeps
+        constraints and island solutions between calls and only redoes what
+        the last moves touched.
+        cancelled, if given, is polled between islands; once it returns True
+        the solve stops with SolveCancelled.
 
-        total_mines = settings.get_mine_amount()  # total mines for the chosen difficulty
-        remaining_mines = total_mines - len(flagged) - revealed_mines  # mines not accounted for yet
-        if remaining_mines < 0:
-            remaining_mines = 0
-
-        unknown = [(r, c) for r in range(settings.ROWS) for c in range(settings.COLS)
-                   if not self.board_list[r][c].revealed and (r, c) not in flagged]  # unrevealed & unflagged tiles
-
-        # Build constraints from revealed safe tiles.
-        frontier_set = set()  # set[(r,c)] unknown tiles that appear in at least one constraint
-        raw_constraints = []  # list[(tiles, required)] where tiles are unknown neighbours of a clue
-        for r in range(settings.ROWS):
-            for c in range(settings.COLS):
-                t = self.board_list[r][c]
-                if not t.revealed or t.type == "X":
-                    continue
-
-                number = self.get_revealed_number(r, c)  # visible clue number for this revealed safe tile
-                flagged_nei = 0  # flagged neighbours around this revealed tile
-                unknown_nei = []  # unrevealed & unflagged neighbours around this revealed tile
-                for nr, nc in self.iter_neighbours(r, c):
-                    if (nr, nc) in flagged:
-                        flagged_nei += 1
-                    else:
-                        nt = self.board_list[nr][nc]
-                        if not nt.revealed:
-                            unknown_nei.append((nr, nc))
-
-                required = number - flagged_nei  # mines that must be in unknown_nei to satisfy this clue
-                if required < 0:
-                    # Flags contradict the visible number.
-                    return [[0.0 for _ in range(settings.COLS)] for _ in range(settings.ROWS)]
-
-                if not unknown_nei:
-                    if required != 0:
-                        return [[0.0 for _ in range(settings.COLS)] for _ in range(settings.ROWS)]
-                    continue
-
-                for pos in unknown_nei:
-                    frontier_set.add(pos)
-                raw_constraints.append((unknown_nei, required))
-
-        # Start probability grid.
-        probs = [[0.0 for _ in range(settings.COLS)] for _ in range(settings.ROWS)]  # output P(mine) grid
-        for (r, c) in flagged:
-            probs[r][c] = 1.0
-
-        # No visible constraints: every unknown tile has the same base rate.
-        if not raw_constraints:
-            base = (remaining_mines / len(unknown)) if unknown else 0.0  # uniform base-rate with no constraints
-            for (r, c) in unknown:
-                probs[r][c] = base
-            return probs
-
-        frontier = sorted(frontier_set)  # list[(r,c)] unknowns adjacent to revealed safe tiles
-        frontier_index = {pos: i for i, pos in enumerate(frontier)}  # map tile -> variable index
-        outside = [pos for pos in unknown if pos not in frontier_set]  # unknowns not constrained by any clue
-        outside_count = len(outside)  # count of outside tiles
-
-        # Convert constraints to index form.
-        constraints = []  # list[(idxs, required)] where idxs are frontier variable indices
-        for tiles, req in raw_constraints:
-            idxs = [frontier_index[pos] for pos in tiles if pos in frontier_index]
-            if idxs:
-                constraints.append((idxs, req))
-
-        n = len(frontier)  # number of frontier variables
-        if n == 0:
-            # Everything unknown is outside; just base rate with global mine count.
-            base = (remaining_mines / len(unknown)) if unknown else 0.0  # uniform base-rate across all unknowns
-            for (r, c) in unknown:
-                probs[r][c] = base
-            return probs
-
-        var_to_constraints = [[] for _ in range(n)]  # adjacency: var index -> list of constraint indices
-        cons_required = []  # cons_required[i] = required mines for constraint i
-        cons_sum = []  # cons_sum[i] = mines currently assigned in constraint i
-        cons_unassigned = []  # cons_unassigned[i] = remaining unassigned vars in constraint i
-        for ci, (idxs, req) in enumerate(constraints):
-            cons_required.append(req)
-            cons_sum.append(0)
-            cons_unassigned.append(len(idxs))
-            for v in idxs:
-                var_to_constraints[v].append(ci)
-
-        assignment = [0] * n  # current partial assignment of frontier vars (0 safe, 1 mine)
-        mine_weight = [0] * n  # weighted count of solutions where var is a mine
-        total_weight = 0  # sum of weights over all consistent solutions found
-        outside_mines_weighted_sum = 0  # weighted sum of outside_mines across solutions
-        solutions_found = 0  # number of solutions encountered (used to cap work)
-
-        def feasible(ci):
-            req = cons_required[ci]
-            s = cons_sum[ci]
-            u = cons_unassigned[ci]
-            return s <= req <= s + u
-
-        cap = None if n <= max_frontier_exact else max_solutions_cap  # cap solutions for large frontiers
-
-        def recurse(i):
-            nonlocal total_weight, outside_mines_weighted_sum, solutions_found
-            if cap is not None and solutions_found >= cap:
-                return
-
-            if i == n:
-                frontier_mines = sum(assignment)  # mines placed in frontier under this assignment
-                outside_mines = remaining_mines - frontier_mines  # mines that must be placed in outside region
-                if outside_mines < 0 or outside_mines > outside_count:
-                    return
-
-                if outside_count == 0:
-                    weight = 1 if outside_mines == 0 else 0  # only valid if no mines remain to place
-                else:
-                    weight = math.comb(outside_count, outside_mines)  # number of outside placements
-                if weight == 0:
-                    return
-
-                total_weight += weight
-                outside_mines_weighted_sum += weight * outside_mines
-                for vi, val in enumerate(assignment):
-                    if val:
-                        mine_weight[vi] += weight
-                solutions_found += 1
-                return
-
-            for val in (0, 1):
-                touched = []
-                for ci in var_to_constraints[i]:
-                    cons_unassigned[ci] -= 1
-                    if val:
-                        cons_sum[ci] += 1
-                    touched.append(ci)
-
-                ok = True
-                for ci in touched:
-                    if not feasible(ci):
-                        ok = False
-                        break
-
-                if ok:
-                    assignment[i] = val
-                    recurse(i + 1)
-                    assignment[i] = 0
-
-                for ci in touched:
-                    if val:
-                        cons_sum[ci] -= 1
-                    cons_unassigned[ci] += 1
-
-                if cap is not None and solutions_found >= cap:
-                    return
-
-        recurse(0)
-
-        if total_weight == 0:
-            # No consistent assignments (usually due to incorrect flags). Fall back.
-            base = (remaining_mines / len(unknown)) if unknown else 0.0
-            for (r, c) in unknown:
-                probs[r][c] = base
-            return probs
-
-        for idx, (r, c) in enumerate(frontier):
-            probs[r][c] = mine_weight[idx] / total_weight
-
-        if outside_count > 0:
-            outside_prob = outside_mines_weighted_sum / (outside_count * total_weight)
-            for (r, c) in outside:
-                probs[r][c] = outside_prob
-
-        return probs
-
-    def draw(self, screen):
-        for row_tiles in self.board_list:
-            for tile in row_tiles:
-                tile.draw(self.board_surface)
-        screen.blit(self.board_surface, (0, 0))
+        Flagged tiles are treated as mines during inference. If the flags
+        contradict a clue, every probability is 0.0.
+        """
+        if self.engine is None:
+            self.engine = ProbabilityEngine(self)
+        return self.engine.probabilities(max_frontier_exact=max_frontier_exact, max_solutions_cap=max_solutions_cap,
+                                         exact=exact, time_budget=time_budget, cancelled=cancelled)
+
+    def probability_grid(self, **options):
+        """probabilities() as a ROWS x COLS grid; revealed tiles get 0.0."""
+        return self.as_grid(*self.probabilities(**options))
+
+    def as_grid(self, values, outside):
+        """Expand a sparse {(r, c): value} result: revealed tiles get 0.0, other tiles missing from values outside."""
+        cols = self.cols
+        grid = [[0.0 if shown else outside for shown in self.revealed[r * cols:(r + 1) * cols]]
+                for r in range(self.rows)]
+        for (r, c), value in values.items():
+            grid[r][c] = value
+        return grid
+
+    def probability_estimate(self, time_budget=0.05, *, max_frontier_exact=32, cancelled=None):
+        """Approximate probability_grid with error bars, for positions too big to count.
+
+        Islands larger than max_frontier_exact are sampled instead of solved
+        (see s_solver.IslandSampler) for about time_budget seconds; calling
+        again on the same position keeps refining the same samples. Returns
+        (probs, errors) where errors[r][c] is the half-width of a 95%
+        confidence interval around probs[r][c] (0.0 where the value is exact).
+        engine.errors keeps the same half-widths in the sparse form of
+        probabilities().
+        """
+        probs = self.probabilities(max_frontier_exact=max_frontier_exact, time_budget=time_budget,
+                                   cancelled=cancelled)
+        errors = self.engine.errors or ({}, 0.0)
+        return self.as_grid(*probs), self.as_grid(*errors)
+
+    def best_moves(self, limit=10, **options):
+        """Certain moves and the best guesses, from one probabilities() solve.
+
+        Returns (safe, mines, guesses): safe and mines list the (row, col) of
+        every covered, unflagged tile that is certainly safe or certainly a
+        mine, in row-major order, so a bot can play all of them before
+        solving again. guesses lists up to limit ((row, col), probability)
+        pairs for the other tiles, least likely to be a mine first; ties go
+        to the tile expected to open the most cells (see opening_estimate),
+        then to row-major order.
+
+        options go to probabilities(), whose last result is reused if the
+        board has not changed. Sampled solves (time_budget) give estimates,
+        so their 0.0 and 1.0 are not proofs. If the flags contradict a clue,
+        all three lists are empty.
+        """
+        probs, outside = self.probabilities(**options)
+        if self.engine.broken:
+            return [], [], []
+
+        cols, flagged = self.cols, self.flagged
+        safe, mines, guesses = [], [], []
+        for pos, p in probs.items():
+            if flagged[pos[0] * cols + pos[1]]:
+                continue
+            if p == 0.0:
+                safe.append(pos)
+            elif p == 1.0:
+                mines.append(pos)
+            else:
+                guesses.append((p, -self.opening_estimate(pos, probs, outside), pos))
+
+        def outside_tiles():
+            """Covered, unflagged tiles away from the clues."""
+            index = self.revealed.find(0)
+            while index != -1:
+                pos = divmod(index, cols)
+                if not flagged[index] and pos not in probs:
+                    yield pos
+                index = self.revealed.find(0, index + 1)
+
+        if outside == 0.0:
+            safe.extend(outside_tiles())
+        elif outside == 1.0:
+            mines.extend(outside_tiles())
+        elif sum(p <= outside for p, _, _ in guesses) < limit:
+            # Tiles away from the clues make the list; their scan is O(board).
+            guesses.extend((outside, -self.opening_estimate(pos, probs, outside), pos) for pos in outside_tiles())
+
+        best = heapq.nsmallest(limit, guesses)
+        return sorted(safe), sorted(mines), [(pos, p) for p, _, pos in best]
+
+    def opening_estimate(self, pos, probs, outside):
+        """Expected number of cells revealing the safe tile pos would open.
+
+        The tile itself, plus its covered neighbours if it turns out empty;
+        the chance of that is taken as the product of the neighbours' safe
+        probabilities, as if they were independent.
+        """
+        cols = self.cols
+        covered = 0  # covered, unflagged neighbours
+        empty = 1.0  # chance that no neighbour is a mine
+        for index in self.neighbour_indices(pos[0] * cols + pos[1]):
+            if self.flagged[index] or (self.revealed[index] and self.mines[index]):
+                return 1.0
+            if not self.revealed[index]:
+                covered += 1
+                empty *= 1.0 - probs.get(divmod(index, cols), outside)
+        return 1.0 + empty * covered
+
+    def changed(self, indices):
+        """Record tiles whose state changed, for the renderer and the engine."""
+        self.dirty_tiles.update(indices)
+        if self.engine is not None:
+            self.engine.touch_many(indices)
 
     def dig(self, row, col):
-        self.dug.append((row, col))
-        tile = self.board_list[row][col]
-
-        if tile.type == "X":
-            tile.revealed = True
-            tile.image = settings.tile_exploded
+        self.flood(row, col)
+        index = row * self.cols + col
+        if self.mines[index]:
+            self.marks[index] = EXPLODED
+            self.dirty_tiles.add(index)
             return False
+        return True
 
-        tile.revealed = True
-        if tile.type == "C":
-            return True
-
-        # Flood fill for empty tiles
-        for r in range(max(0, row - 1), min(settings.ROWS - 1, row + 1) + 1):
-            for c in range(max(0, col - 1), min(settings.COLS - 1, col + 1) + 1):
-                if (r, c) not in self.dug:
-                    self.dig(r, c)
+    def empty_runs(self, row):
+        """Maximal runs [start, end) of empty, unflagged tiles in a row, as flat indices.
 
-        return True
+        Runs of zero counts are found with a regex over the row's bytes. Mines
+        also store a zero count, but no mine touches an empty tile, so a zero
+        run is either all mines or all empty tiles.
+        """
+        base = row * self.cols
+        runs = []
+        for match in ZERO_RUN.finditer(self.counts, base, base + self.cols):
+            start, end = match.span()
+            if self.mines[start]:
+                continue
+            flag = self.flagged.find(1, start, end)
+            while flag != -1:
+                if flag > start:
+                    runs.append((start, flag))
+                start = flag + 1
+                flag = self.flagged.find(1, start, end)
+            if start < end:
+                runs.append((start, end))
+        return runs
+
+    def flood(self, row, col):
+        """Reveal (row, col) and, from an empty tile, the whole empty region around it.
+
+        Scanline fill: the region is walked as horizontal runs of empty tiles
+        (see empty_runs), breadth-first from the run holding the start tile.
+        Each run reveals itself plus its one-tile border in the rows above and
+        below with slice assignments, so the per-tile work happens in C.
+        Flagged tiles are left covered. Returns the flat indices
+        (row * cols + col) of the tiles revealed by this call.
+        """
+        rows, cols = self.rows, self.cols
+        revealed, flagged = self.revealed, self.flagged
+        start = row * cols + col
+        if revealed[start] or flagged[start]:
+            return []
+
+        if self.mines[start] or self.counts[start]:
+            revealed[start] = 1
+            opened = [start]
+        else:
+            before = bytes(revealed)
+            run_cache = {}  # row -> (runs, run ends) for rows reached so far
+
+            def runs_of(r):
+                entry = run_cache.get(r)
+                if entry is None:
+                    runs = self.empty_runs(r)
+                    entry = run_cache[r] = (runs, [end for _, end in runs])
+                return entry
+
+            runs, ends = runs_of(row)
+            first = runs[bisect_right(ends, start)]  # run holding the start tile
+            queue = deque([(row, first)])
+            seen = {first}
+            top = bottom = row  # rows touched, to bound the diff below
+            while queue:
+                r, (run_start, run_end) = queue.popleft()
+                c0 = run_start - r * cols
+                c1 = run_end - r * cols
+                lo, hi = max(c0 - 1, 0), min(c1 + 1, cols)  # run plus its border, clipped to the row
+                for nr in range(max(r - 1, 0), min(r + 1, rows - 1) + 1):
+                    base = nr * cols
+                    revealed[base + lo:base + hi] = b"\x01" * (hi - lo)
+                    flag = flagged.find(1, base + lo, base + hi)
+                    while flag != -1:
+                        revealed[flag] = before[flag]
+                        flag = flagged.find(1, flag + 1, base + hi)
+                    if nr == r:
+                        continue
+
+                    nruns, nends = runs_of(nr)
+                    for i in range(bisect_right(nends, base + c0 - 1), len(nruns)):
+                        run = nruns[i]
+                        if run[0] > base + c1:
+                            break
+                        if run not in seen:
+                            seen.add(run)
+                            queue.append((nr, run))
+                top, bottom = min(top, r - 1), max(bottom, r + 1)
+
+            lo = max(top, 0) * cols
+            hi = (min(bottom, rows - 1) + 1) * cols
+            changed = (int.from_bytes(before[lo:hi], "big") ^ int.from_bytes(revealed[lo:hi], "big")).to_bytes(hi - lo, "big")
+            opened = list(compress(range(lo, hi), changed))
+
+        if self.journal is not None:
+            for index in opened:
+                self.journal.setdefault(index, 0)  # flood only opens covered, unflagged tiles
+        self.changed(opened)
+        return opened
 
     def has_dugged(self, row, col):
-        return self.board_list[row][col].revealed
+        return bool(self.revealed[row * self.cols + col])
 
     def reveal(self, row, col):
-        tile = self.board_list[row][col]
-        if tile.type == "X":
-            tile.revealed = True
-            tile.flagged = False
+        index = row * self.cols + col
+        if self.mines[index]:
+            self.note(index)
+            self.revealed[index] = 1
+            self.flagged[index] = 0
+            self.changed((index,))
             return True
         return False
 
+    def toggle_flag(self, row, col):
+        index = row * self.cols + col
+        if self.revealed[index]:
+            return False
+        self.note(index)
+        self.flagged[index] ^= 1
+        self.changed((index,))
+        return True
+
+    def cell_state(self, index):
+        return self.revealed[index] | self.flagged[index] << 1
+
+    def note(self, index):
+        """Remember the state of a tile about to change, if a move is being recorded."""
+        if self.journal is not None and index not in self.journal:
+            self.journal[index] = self.cell_state(index)
+
+    def begin_move(self):
+        """Start recording the tiles changed by one player action."""
+        self.journal = {}
+
+    def end_move(self, charges=0):
+        """Stop recording and return the Move, or None if nothing changed."""
+        journal, self.journal = self.journal or {}, None
+        indices = [index for index, old in journal.items() if self.cell_state(index) != old]
+        if not indices and not charges:
+            return None
+        return Move(array("i", indices), bytes(journal[index] for index in indices),
+                    bytes(self.cell_state(index) for index in indices), charges)
+
+    def apply_move(self, move, undo=True):
+        """Put the tiles of move back to their state before (undo) or after (redo) it."""
+        states = move.before if undo else move.after
+        for index, state in zip(move.indices, states):
+            self.revealed[index] = state & 1
+            self.flagged[index] = state >> 1
+            self.marks.pop(index, None)
+        self.changed(move.indices)
+
+    def expose_mines(self):
+        """Game over: reveal every mine and mark flags placed on safe tiles."""
+        for index in range(self.rows * self.cols):
+            if self.mines[index]:
+                self.revealed[index] = 1
+            elif self.flagged[index]:
+                self.flagged[index] = 0
+                self.revealed[index] = 1
+                self.marks[index] = WRONG_FLAG
+        self.reset_engine()
+        self.redraw_all()
+
+    def flag_unrevealed(self):
+        """Game won: flag every tile that is still covered."""
+        for index in range(self.rows * self.cols):
+            if not self.revealed[index]:
+                self.flagged[index] = 1
+        self.reset_engine()
+        self.redraw_all()
+
+    def check_win(self):
+        """True once every safe tile is revealed."""
+        # Each cell is a 0/1 byte, so OR-ing the grids as big integers ORs them cell by cell.
+        covered = int.from_bytes(self.mines, "big") | int.from_bytes(self.revealed, "big")
+        return covered == int.from_bytes(b"\x01" * (self.rows * self.cols), "big")
+
+    def save_state(self):
+        """Snapshot of the mutable cell state, restorable with load_state."""
+        return bytes(self.mines), bytes(self.revealed), bytes(self.flagged)
+
+    def load_state(self, state):
+        mines, revealed, flagged = state
+        if mines != self.mines:
+            self.mines[:] = mines
+            self.place_clues()
+        self.revealed[:] = revealed
+        self.flagged[:] = flagged
+        self.marks.clear()
+        self.reset_engine()
+        self.redraw_all()
+
+    def redraw_all(self):
+        """Tell renderers that every tile may have changed."""
+        self.dirty_tiles.clear()
+        self.epoch += 1
+
+    def sync_state(self, state):
+        """load_state that only touches the tiles that differ, keeping the engine caches."""
+        mines, revealed, flagged = state
+        if mines != self.mines:
+            self.load_state(state)
+            return
+        # Compare the planes block by block and only look at tiles in blocks that
+        # differ. Small steps also let the game thread run when this is called
+        # from the probability worker: one whole-plane operation on a huge board
+        # would hold the GIL for several frames.
+        size = self.rows * self.cols
+        step = 4096
+        indices = []
+        for start in range(0, size, step):
+            end = min(start + step, size)
+            if revealed[start:end] != self.revealed[start:end] or flagged[start:end] != self.flagged[start:end]:
+                indices.extend(index for index in range(start, end) if revealed[index] != self.revealed[index]
+                               or flagged[index] != self.flagged[index])
+        self.revealed[:] = revealed
+        self.flagged[:] = flagged
+        self.changed(indices)
+
     def display_board(self):
         for row in self.board_list:
             print(row)
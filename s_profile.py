@@ -0,0 +1,158 @@
+"""Opt-in timing of the game's hot stages.
+
+Profiling is off unless main.py runs with --profile [TRACE] or the
+MINESWEEPER_PROFILE environment variable names a trace file. When it is
+off nothing is wrapped, so the only cost is one check per frame.
+
+When on, enable() replaces the instrumented methods with timing wrappers.
+Every frame appends one record to the trace: the frame time, calls and
+milliseconds per stage, and the counters of the last probability solve
+(engine.stats). A .csv trace gets one row per frame, anything else one
+JSON object per line. Solves run on the worker thread; they are counted
+in the frame during which they finish.
+"""
+import atexit
+import csv
+import json
+import os
+import threading
+import time
+from functools import wraps
+
+ENV_VAR = "MINESWEEPER_PROFILE"
+DEFAULT_TRACE = "profile.jsonl"
+HUD_INTERVAL = 0.5  # seconds between updates of the on-screen summary
+
+# stage name -> label in the on-screen summary; the CSV columns follow this order
+STAGES = {
+    "events": "events",
+    "draw": "draw",
+    "board_draw": "board",
+    "overlay": "overlay",
+    "dig": "dig",
+    "push_state": "push",
+    "save_state": "save",
+    "solve": "solve",
+}
+SOLVER_COUNTERS = ("frontier", "forced", "components", "solved", "nodes", "solutions", "capped")
+
+active = None  # the running Profiler, or None when profiling is off
+
+
+class Profiler:
+    """Collects per-stage timings frame by frame and writes them to a trace file."""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "w", newline="")
+        self.csv = None
+        if path.endswith(".csv"):
+            self.csv = csv.writer(self.file)
+            self.csv.writerow(["frame", "ms"] + [f"{stage}_{field}" for stage in STAGES for field in ("calls", "ms")]
+                              + list(SOLVER_COUNTERS))
+        self.lock = threading.Lock()  # the solve stage is recorded from the worker thread
+        self.frame = 0
+        self.frame_start = time.perf_counter()
+        self.stages = {}  # stage -> [calls, seconds] in the current frame
+        self.solver = {}  # counters of the last solve
+        self.window = {}  # stage -> seconds since the summary was last refreshed
+        self.window_frames = 0
+        self.window_start = self.frame_start
+        self.summary = "profiling..."  # one-line summary for the HUD
+
+    def record(self, stage, seconds, counters=None):
+        with self.lock:
+            entry = self.stages.get(stage)
+            if entry is None:
+                entry = self.stages[stage] = [0, 0.0]
+            entry[0] += 1
+            entry[1] += seconds
+            if counters is not None:
+                self.solver = dict(counters)
+
+    def end_frame(self):
+        """Close the current frame: write its record and refresh the summary."""
+        now = time.perf_counter()
+        seconds = now - self.frame_start
+        self.frame_start = now
+        with self.lock:
+            stages, self.stages = self.stages, {}
+            solver = self.solver
+        self.frame += 1
+
+        if self.csv is not None:
+            row = [self.frame, round(1000 * seconds, 3)]
+            for stage in STAGES:
+                calls, spent = stages.get(stage, (0, 0.0))
+                row += [calls, round(1000 * spent, 3)]
+            self.csv.writerow(row + [solver.get(name, "") for name in SOLVER_COUNTERS])
+        else:
+            record = {"frame": self.frame, "ms": round(1000 * seconds, 3),
+                      "stages": {stage: {"calls": calls, "ms": round(1000 * spent, 3)}
+                                 for stage, (calls, spent) in stages.items()}}
+            if "solve" in stages:
+                record["solver"] = solver
+            self.file.write(json.dumps(record) + "\n")
+
+        self.window_frames += 1
+        self.window["frame"] = self.window.get("frame", 0.0) + seconds
+        for stage, (_, spent) in stages.items():
+            self.window[stage] = self.window.get(stage, 0.0) + spent
+        if now - self.window_start >= HUD_INTERVAL:
+            self.summary = self.summarize(solver)
+            self.window, self.window_frames, self.window_start = {}, 0, now
+
+    def summarize(self, solver):
+        """Average milliseconds per frame of every stage seen, and the last solver counters."""
+        frames = self.window_frames
+        parts = [f"frame {1000 * self.window['frame'] / frames:.1f}ms",
+                 " ".join(f"{label} {1000 * self.window[stage] / frames:.1f}" for stage, label in STAGES.items()
+                          if self.window.get(stage))]
+        if solver:
+            parts.append(f"frontier {solver['frontier']} islands {solver['components']} nodes {solver['nodes']}"
+                         + (" capped" if solver["capped"] else ""))
+        return " | ".join(parts)
+
+    def close(self):
+        self.file.close()
+
+
+def instrument(owner, name, stage, counters=None):
+    """Time every call of owner.name as stage; counters(self) gives extra counters to record."""
+    original = getattr(owner, name)
+
+    @wraps(original)
+    def timed(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return original(*args, **kwargs)
+        finally:
+            active.record(stage, time.perf_counter() - start, counters(args[0]) if counters else None)
+
+    setattr(owner, name, timed)
+
+
+def enable(path=None):
+    """Start profiling to path (default: $MINESWEEPER_PROFILE, else DEFAULT_TRACE).
+
+    Wraps the Board, engine and renderer stages; the game wraps its own
+    methods with instrument() and calls active.end_frame() every frame.
+    """
+    global active
+    if active is not None:
+        return active
+    from s_logic import Board, ProbabilityEngine
+    from s_render import BoardRenderer
+
+    active = Profiler(path or os.environ.get(ENV_VAR) or DEFAULT_TRACE)
+    atexit.register(active.close)
+    instrument(BoardRenderer, "draw", "board_draw")
+    instrument(Board, "dig", "dig")
+    instrument(Board, "save_state", "save_state")
+    instrument(ProbabilityEngine, "probabilities", "solve", counters=lambda engine: engine.stats)
+    return active
+
+
+def requested():
+    """True if the environment asks for profiling."""
+    return bool(os.environ.get(ENV_VAR))
@@ -0,0 +1,172 @@
+from collections import OrderedDict
+import pygame
+import settings
+from s_logic import Tile
+
+CHUNK = 16  # chunk side in tiles; each chunk has its own cached surface
+ZOOM_LEVELS = (8, 12, 16, 24, 32, 48, 64)  # tile sizes on screen, in pixels
+
+
+class Camera:
+    """Scrollable, zoomable window onto a board.
+
+    x, y is the board pixel (at the current tile_size) shown at the top-left
+    of the viewport, which covers width x height screen pixels starting at
+    the screen origin.
+    """
+
+    def __init__(self, rows, cols, width, height, tile_size=None):
+        self.rows, self.cols = rows, cols
+        self.width, self.height = width, height
+        self.tile_size = settings.TILESIZE if tile_size is None else tile_size
+        self.x = self.y = 0
+
+    @property
+    def rect(self):
+        """Viewport rectangle on screen."""
+        return pygame.Rect(0, 0, self.width, self.height)
+
+    def clamp(self):
+        self.x = max(0, min(self.x, self.cols * self.tile_size - self.width))
+        self.y = max(0, min(self.y, self.rows * self.tile_size - self.height))
+
+    def pan(self, dx, dy):
+        self.x += dx
+        self.y += dy
+        self.clamp()
+
+    def zoom(self, steps, anchor=None):
+        """Move steps zoom levels in (positive) or out, keeping the board point under anchor still."""
+        sizes = sorted(set(ZOOM_LEVELS) | {self.tile_size})
+        level = max(0, min(sizes.index(self.tile_size) + steps, len(sizes) - 1))
+        size = sizes[level]
+        if size == self.tile_size:
+            return
+        ax, ay = anchor if anchor is not None else (self.width // 2, self.height // 2)
+        self.x = (self.x + ax) * size // self.tile_size - ax
+        self.y = (self.y + ay) * size // self.tile_size - ay
+        self.tile_size = size
+        self.clamp()
+
+    def tile_at(self, sx, sy):
+        """(row, col) of the tile under screen point (sx, sy), or None outside the board."""
+        if not (0 <= sx < self.width and 0 <= sy < self.height):
+            return None
+        row, col = (self.y + sy) // self.tile_size, (self.x + sx) // self.tile_size
+        if 0 <= row < self.rows and 0 <= col < self.cols:
+            return row, col
+        return None
+
+    def tile_rect(self, row, col):
+        """Screen rectangle of a tile (possibly outside the viewport)."""
+        size = self.tile_size
+        return pygame.Rect(col * size - self.x, row * size - self.y, size, size)
+
+    def visible_tiles(self):
+        """Visible tile ranges as (first row, end row, first col, end col)."""
+        size = self.tile_size
+        return (self.y // size, min(self.rows, (self.y + self.height - 1) // size + 1),
+                self.x // size, min(self.cols, (self.x + self.width - 1) // size + 1))
+
+    def visible_chunks(self):
+        """(chunk row, chunk col) of every chunk overlapping the viewport."""
+        r0, r1, c0, c1 = self.visible_tiles()
+        return [(cr, cc) for cr in range(r0 // CHUNK, (r1 - 1) // CHUNK + 1)
+                for cc in range(c0 // CHUNK, (c1 - 1) // CHUNK + 1)]
+
+
+class BoardRenderer:
+    """Draws the visible part of a Board through a Camera.
+
+    The board is split into CHUNK x CHUNK tile chunks. Each chunk that has
+    been on screen keeps a surface with its tiles at the camera's tile size;
+    tiles in board.dirty_tiles are re-blitted onto their chunk surface and
+    then onto the screen, so a move costs as many blits as tiles it changed.
+    Chunks are kept in LRU order and the least recently seen are dropped,
+    so memory follows the viewport, not the board.
+    """
+
+    def __init__(self, board, camera=None):
+        settings.load_assets()
+        self.board = board
+        self.camera = camera or Camera(board.rows, board.cols, settings.WIDTH, settings.HEIGHT)
+        self.chunks = OrderedDict()  # (chunk row, chunk col) -> Surface, least recently drawn first
+        self.scaled = {}  # id(tile image) -> image scaled to the camera's tile size
+        self.tile_size = None  # tile size of the cached surfaces
+        self.epoch = None  # board.epoch the cached surfaces were drawn at
+        self.view = None  # camera position of the last draw
+
+    def face(self, row, col):
+        image = Tile(self.board, row, col).face
+        if self.tile_size == settings.TILESIZE:
+            return image
+        scaled = self.scaled.get(id(image))
+        if scaled is None:
+            scaled = self.scaled[id(image)] = pygame.transform.scale(image, (self.tile_size, self.tile_size))
+        return scaled
+
+    def chunk(self, key):
+        """Cached surface of a chunk, drawn first if needed."""
+        surface = self.chunks.get(key)
+        if surface is not None:
+            self.chunks.move_to_end(key)
+            return surface
+        board, size = self.board, self.tile_size
+        r0, c0 = key[0] * CHUNK, key[1] * CHUNK
+        r1, c1 = min(r0 + CHUNK, board.rows), min(c0 + CHUNK, board.cols)
+        surface = pygame.Surface(((c1 - c0) * size, (r1 - r0) * size))
+        surface.blits([(self.face(r, c), ((c - c0) * size, (r - r0) * size))
+                       for r in range(r0, r1) for c in range(c0, c1)], False)
+        self.chunks[key] = surface
+        return surface
+
+    def draw(self, screen, full=False):
+        """Bring the viewport on screen up to date.
+
+        Redraws the whole viewport when full is set or the camera moved,
+        otherwise only the dirty tiles. Returns the list of screen rects that
+        were updated.
+        """
+        board, camera = self.board, self.camera
+        if board.epoch != self.epoch or camera.tile_size != self.tile_size:
+            self.chunks.clear()
+            self.scaled.clear()
+            self.epoch, self.tile_size = board.epoch, camera.tile_size
+            full = True
+        view = (camera.x, camera.y, camera.tile_size)
+        if view != self.view:
+            self.view = view
+            full = True
+
+        size = self.tile_size
+        viewport = camera.rect
+        pending = []  # (chunk surface, screen rect, area of the chunk surface) per visible dirty tile
+        for index in board.dirty_tiles:
+            row, col = divmod(index, board.cols)
+            surface = self.chunks.get((row // CHUNK, col // CHUNK))
+            if surface is None:
+                continue  # drawn from scratch when it comes into view
+            local = ((col % CHUNK) * size, (row % CHUNK) * size)  # tile position on its chunk surface
+            surface.blit(self.face(row, col), local)
+            if not full:
+                tile = camera.tile_rect(row, col)
+                rect = tile.clip(viewport)
+                if rect.width and rect.height:
+                    area = pygame.Rect(local[0] + rect.x - tile.x, local[1] + rect.y - tile.y, rect.width, rect.height)
+                    pending.append((surface, rect, area))
+        board.dirty_tiles.clear()
+
+        if full:
+            visible = camera.visible_chunks()
+            screen.set_clip(viewport)
+            screen.fill(settings.BGCOLOUR, viewport)
+            for key in visible:
+                screen.blit(self.chunk(key), (key[1] * CHUNK * size - camera.x, key[0] * CHUNK * size - camera.y))
+            screen.set_clip(None)
+            while len(self.chunks) > 2 * len(visible) + 8:
+                self.chunks.popitem(last=False)
+            return [viewport]
+
+        for surface, rect, area in pending:
+            screen.blit(surface, rect, area)
+        return [rect for _, rect, _ in pending]
@@ -0,0 +1,165 @@
+import mmap
+import struct
+import settings
+from s_logic import Board, optional_numpy
+
+# Game file layout (little-endian):
+#   header    HEADER struct, see below
+#   planes    mines, revealed, flagged: one bit per cell, cell i -> byte i // 8, bit i % 8
+#   move log  move_count ACTION records (op, cell index)
+MAGIC = b"MSWP"
+VERSION = 1
+HEADER = struct.Struct("<4sHHIIIQi8sI")  # magic, version, flags, rows, cols, mines, seed, detector charges, difficulty, move count
+ACTION = struct.Struct("<BI")  # op, cell index
+
+FLAG_STARTED = 1  # mines have been placed (the first click happened)
+
+# Move log ops
+DIG = 1
+FLAG = 2
+DETECT = 3
+UNDO = 4
+REDO = 5
+
+
+def pack_bits(plane):
+    """Pack a 0/1 byte per cell into one bit per cell.
+
+    Uses NumPy when available. Otherwise the eight interleaved slices
+    plane[j::8] are read as big integers, where cell 8k + j sits at bit 8k,
+    shifted by j and added, which puts all eight cells of group k in byte k.
+    """
+    np = optional_numpy()
+    if np is not None:
+        return np.packbits(np.frombuffer(bytes(plane), dtype=np.uint8), bitorder="little").tobytes()
+    size = (len(plane) + 7) // 8
+    packed = 0
+    for j in range(8):
+        packed |= int.from_bytes(plane[j::8], "little") << j
+    return packed.to_bytes(size, "little")
+
+
+def unpack_bits(packed, count):
+    """Inverse of pack_bits: bytearray of count 0/1 cells."""
+    if len(packed) * 8 < count:
+        raise ValueError(f"{len(packed)} packed bytes cannot hold {count} cells")
+    np = optional_numpy()
+    if np is not None:
+        bits = np.unpackbits(np.frombuffer(packed, dtype=np.uint8), count=count, bitorder="little")
+        return bytearray(bits.tobytes())
+    size = len(packed)
+    value = int.from_bytes(packed, "little")
+    low_bits = int.from_bytes(b"\x01" * size, "little")  # bit 0 of every byte
+    cells = bytearray(size * 8)
+    for j in range(8):
+        cells[j::8] = ((value >> j) & low_bits).to_bytes(size, "little")
+    return cells[:count]
+
+
+def save_game(path, board, *, difficulty=None, detector_count=0, started=True, actions=()):
+    """Write board and game metadata to path in the binary game format.
+
+    actions is the move log: an iterable of (op, cell index) using the op
+    constants of this module.
+    """
+    actions = list(actions)
+    difficulty = settings.DIFFICULTY if difficulty is None else difficulty
+    header = HEADER.pack(MAGIC, VERSION, FLAG_STARTED if started else 0, board.rows, board.cols,
+                         board.total_mines, board.seed, detector_count,
+                         difficulty.encode("ascii")[:8], len(actions))
+    with open(path, "wb") as f:
+        f.write(header)
+        for plane in (board.mines, board.revealed, board.flagged):
+            f.write(pack_bits(plane))
+        f.write(b"".join(ACTION.pack(op, index) for op, index in actions))
+
+
+class GameFile:
+    """Read-only, memory-mapped view of a saved game.
+
+    Opening parses the header and checks that the file is long enough for
+    the planes and the move log it announces; a damaged or truncated file
+    raises ValueError. Planes are slices of the mapping and are not copied
+    until asked for. Use as a context manager or call close(); views handed
+    out by plane() are released by close() and cannot be used afterwards.
+    """
+
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        self.map = self.view = None
+        self.views = []  # memoryviews handed out by plane(), released by close()
+        try:
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.view = memoryview(self.map)
+            self.read_header(path)
+        except BaseException:
+            self.close()
+            raise
+
+    def read_header(self, path):
+        try:
+            (magic, version, flags, self.rows, self.cols, self.mines, self.seed, self.detector_count,
+             difficulty, self.move_count) = HEADER.unpack_from(self.map)
+        except struct.error:
+            raise ValueError(f"{path} is too short to be a saved game") from None
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a saved game")
+        if version != VERSION:
+            raise ValueError(f"unsupported game file version {version}")
+        self.started = bool(flags & FLAG_STARTED)
+        self.difficulty = difficulty.rstrip(b"\0").decode("ascii")
+
+        self.cells = self.rows * self.cols
+        self.plane_size = (self.cells + 7) // 8
+        self.moves_offset = HEADER.size + 3 * self.plane_size
+        if len(self.map) < self.moves_offset + self.move_count * ACTION.size:
+            raise ValueError(f"{path} is truncated")
+
+    def plane(self, which):
+        """Packed bits of plane which (0 mines, 1 revealed, 2 flagged), without copying."""
+        start = HEADER.size + which * self.plane_size
+        view = self.view[start:start + self.plane_size]
+        self.views.append(view)
+        return view
+
+    def cells_of(self, which):
+        """Unpacked 0/1 bytearray for plane which."""
+        start = HEADER.size + which * self.plane_size
+        with self.view[start:start + self.plane_size] as packed:
+            return unpack_bits(packed, self.cells)
+
+    def actions(self):
+        """Iterate the move log as (op, cell index) pairs.
+
+        The log is copied out of the mapping, so the iterator stays valid
+        after close().
+        """
+        end = self.moves_offset + self.move_count * ACTION.size
+        return ACTION.iter_unpack(self.map[self.moves_offset:end])
+
+    def board(self):
+        """Build a Board holding the saved position."""
+        board = Board(self.rows, self.cols, self.mines, seed=self.seed)
+        board.load_state((self.cells_of(0), self.cells_of(1), self.cells_of(2)))
+        return board
+
+    def close(self):
+        """Release the views and unmap the file.
+
+        Raises BufferError if something still holds a buffer of a plane()
+        view, e.g. a NumPy array made from it with frombuffer.
+        """
+        for view in self.views:
+            view.release()
+        self.views.clear()
+        if self.view is not None:
+            self.view.release()
+        if self.map is not None:
+            self.map.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,789 @@
+import json
+import math
+import os
+import random
+from collections import OrderedDict, deque
+from operator import add, mul
+
+PATTERN_CACHE_SIZE = 50000  # solved island shapes kept by a PatternCache
+TILT_LIMIT = 50.0  # bound on the per-mine log tilt searched by combine_components
+LOG2 = math.log(2)
+# The eight symmetries of the square grid: (row, col) -> (row', col').
+SYMMETRIES = (
+    lambda r, c: (r, c), lambda r, c: (r, -c), lambda r, c: (-r, c), lambda r, c: (-r, -c),
+    lambda r, c: (c, r), lambda r, c: (c, -r), lambda r, c: (-c, r), lambda r, c: (-c, -r),
+)
+
+
+class SolveCancelled(Exception):
+    """Raised when the cancelled() callback given to a solve returns True."""
+
+
+def check_cancelled(cancelled):
+    if cancelled is not None and cancelled():
+        raise SolveCancelled
+
+
+def split_components(n, constraints):
+    """Split frontier variables into independent islands.
+
+    Two variables belong to the same island when some constraint mentions
+    both of them. Islands never share a constraint, so each one can be
+    enumerated on its own and the results combined afterwards.
+
+    Returns a list of (variables, local_constraints) where variables is a
+    sorted list of global variable indices and local_constraints uses
+    indices into that list.
+    """
+    parent = list(range(n))  # union-find parent pointers over variable indices
+
+    def find(v):
+        while parent[v] != v:
+            parent[v] = parent[parent[v]]
+            v = parent[v]
+        return v
+
+    for idxs, _ in constraints:
+        root = find(idxs[0])
+        for v in idxs[1:]:
+            other = find(v)
+            if other != root:
+                parent[other] = root
+
+    groups = {}  # root -> list of variable indices
+    for v in range(n):
+        groups.setdefault(find(v), []).append(v)
+
+    group_constraints = {}  # root -> list of constraints (global indices)
+    for idxs, req in constraints:
+        group_constraints.setdefault(find(idxs[0]), []).append((idxs, req))
+
+    components = []
+    for root, variables in groups.items():
+        local = {v: i for i, v in enumerate(variables)}  # global index -> local index
+        cons = [([local[v] for v in idxs], req) for idxs, req in group_constraints.get(root, [])]
+        components.append((variables, cons))
+    return components
+
+
+def propagate(constraints):
+    """Settle the tiles that the clues force on their own.
+
+    constraints is an iterable of (tiles, required). Runs two rules to a
+    fixpoint:
+
+    - trivial: required == 0 makes every tile safe, required == len(tiles)
+      makes every tile a mine;
+    - subset: when the tiles of A are a strict subset of the tiles of B, B is
+      replaced by (B - A, required_B - required_A).
+
+    Forced tiles are substituted into the remaining constraints after every
+    round. Returns (forced, leftover) where forced maps tile -> 0/1 and
+    leftover is a list of (tiles, required) over the undecided tiles only, or
+    None when the constraints contradict each other.
+    """
+    forced = {}  # tile -> 0 (safe) / 1 (mine)
+    work = {}  # frozenset(tiles) -> required
+    for tiles, req in constraints:
+        tiles = frozenset(tiles)
+        if work.get(tiles, req) != req:
+            return None
+        work[tiles] = req
+
+    while True:
+        # Trivial rule, substituting tiles forced so far.
+        reduced = {}
+        progress = False
+        for tiles, req in work.items():
+            if any(t in forced for t in tiles):
+                req -= sum(forced[t] for t in tiles if t in forced)
+                tiles = frozenset(t for t in tiles if t not in forced)
+            if req < 0 or req > len(tiles):
+                return None
+            if not tiles:
+                continue
+            if req == 0 or req == len(tiles):
+                value = 1 if req else 0
+                for t in tiles:
+                    forced[t] = value
+                progress = True
+                continue
+            if reduced.get(tiles, req) != req:
+                return None
+            reduced[tiles] = req
+        work = reduced
+        if progress:
+            continue
+
+        # Subset rule: each constraint is shrunk by at most one subset per round.
+        by_tile = {}  # tile -> constraints containing it
+        for tiles in work:
+            for t in tiles:
+                by_tile.setdefault(t, []).append(tiles)
+        reduced = {}
+        for tiles, req in work.items():
+            for other in {o for t in tiles for o in by_tile[t]}:
+                if len(other) < len(tiles) and other <= tiles:
+                    tiles, req = tiles - other, req - work[other]
+                    progress = True
+                    break
+            if reduced.get(tiles, req) != req:
+                return None
+            reduced[tiles] = req
+        work = reduced
+        if not progress:
+            break
+
+    return forced, [(tuple(sorted(tiles)), req) for tiles, req in work.items()]
+
+
+class Island:
+    """Solved island: mine-count polynomial plus per-variable marginals.
+
+    poly[k] is the number of consistent assignments of the island placing
+    exactly k mines. Subclasses provide marginals(weights, cancelled=None),
+    which returns, for every variable, the sum of weights[k] over the
+    assignments (with k mines) making it a mine. Weights are integers;
+    cancelled, if given, is polled during long passes. nodes and capped
+    describe the work done to solve it, for profiling.
+    """
+    nodes = 0  # search nodes (or DP states) visited
+    capped = False  # True if enumeration stopped at its solution cap
+
+    def __init__(self, n, poly):
+        self.n = n
+        self.poly = poly
+
+
+class EnumeratedIsland(Island):
+    """Island solved by listing assignments into a {k: [solutions, tallies]} histogram."""
+
+    def __init__(self, n, histogram):
+        poly = [0] * (max(histogram) + 1 if histogram else 1)
+        for k, (count, _) in histogram.items():
+            poly[k] = count
+        super().__init__(n, poly)
+        self.histogram = histogram
+
+    def marginals(self, weights, cancelled=None):
+        mine_weight = [0] * self.n  # weighted count of assignments where var is a mine
+        for k, (_, tallies) in self.histogram.items():
+            wk = weights[k]
+            if wk:
+                for v, tally in enumerate(tallies):
+                    if tally:
+                        mine_weight[v] += tally * wk
+        return mine_weight
+
+
+def enumerate_component(n, constraints, cap=None):
+    """Enumerate every consistent assignment of one island.
+
+    Returns an EnumeratedIsland whose histogram {mine_count: [solutions,
+    tallies]} holds the number of assignments placing mine_count mines and,
+    in tallies[v], how many of those assignments make variable v a mine.
+
+    Variables are assigned in frontier_order, so constraints close early and
+    dead branches are cut soon. The partial assignment is one int with a bit
+    per variable and every constraint a bitmask of its variables, so a
+    feasibility check is one AND and one bit_count. Tallies are kept in bulk:
+    the assignment is also held "spread out", one width-bit field per
+    variable, and each solution adds it to a per-mine-count total in a
+    single big-int addition; the fields are split into tallies at the end.
+
+    When cap is given the search stops after that many solutions; the
+    histogram then only covers the branches explored so far.
+    """
+    order = frontier_order(n, constraints)
+    position = [0] * n  # var -> position in order (its bit in the assignment)
+    for i, v in enumerate(order):
+        position[v] = i
+
+    # checks[i]: (mask, required, variables left after position i) of every
+    # constraint containing the variable at position i.
+    checks = [[] for _ in range(n)]
+    for idxs, req in constraints:
+        mask = 0
+        for v in idxs:
+            mask |= 1 << position[v]
+        for v in idxs:
+            checks[position[v]].append((mask, req, (mask >> (position[v] + 1)).bit_count()))
+
+    width = n + 1  # bits per tally field: no count exceeds 2 ** n
+    counts = {}  # mine_count -> solutions
+    totals = {}  # mine_count -> sum of the spread-out solutions
+    solutions_found = 0  # number of solutions encountered (used to cap work)
+    nodes = 0  # recursion steps, for profiling
+
+    def recurse(i, assigned, spread, mines):
+        nonlocal solutions_found, nodes
+        nodes += 1
+        if i == n:
+            counts[mines] = counts.get(mines, 0) + 1
+            totals[mines] = totals.get(mines, 0) + spread
+            solutions_found += 1
+            return
+
+        bit = 1 << i
+        for val in (0, 1):
+            state = assigned | bit if val else assigned
+            for mask, req, left in checks[i]:
+                s = (state & mask).bit_count()
+                if s > req or s + left < req:
+                    break
+            else:
+                if val:
+                    recurse(i + 1, state, spread + (1 << i * width), mines + 1)
+                else:
+                    recurse(i + 1, state, spread, mines)
+                if cap is not None and solutions_found >= cap:
+                    return
+
+    recurse(0, 0, 0, 0)
+
+    field = (1 << width) - 1
+    histogram = {}
+    for k, count in counts.items():
+        total = totals[k]
+        histogram[k] = [count, [(total >> position[v] * width) & field for v in range(n)]]
+    island = EnumeratedIsland(n, histogram)
+    island.nodes = nodes
+    island.capped = cap is not None and solutions_found >= cap
+    return island
+
+
+def frontier_order(n, constraints):
+    """Order variables so that few constraints are open at any point.
+
+    Breadth-first walk over the variable adjacency graph starting from a
+    low-degree variable (Cuthill-McKee style). Frontier islands are mostly thin
+    bands of tiles, so this keeps the set of partially assigned constraints,
+    and therefore the DP state space in count_component, small.
+    """
+    neighbours = [set() for _ in range(n)]  # var -> vars sharing a constraint with it
+    for idxs, _ in constraints:
+        for v in idxs:
+            neighbours[v].update(idxs)
+    for v in range(n):
+        neighbours[v].discard(v)
+
+    order = []
+    seen = [False] * n
+    for start in sorted(range(n), key=lambda v: len(neighbours[v])):
+        if seen[start]:
+            continue
+        seen[start] = True
+        queue = deque([start])
+        while queue:
+            v = queue.popleft()
+            order.append(v)
+            for w in sorted(neighbours[v], key=lambda w: len(neighbours[w])):
+                if not seen[w]:
+                    seen[w] = True
+                    queue.append(w)
+    return order
+
+
+class CountedIsland(Island):
+    """Island solved exactly by dynamic programming over the frontier ordering.
+
+    Variables are assigned one at a time in frontier_order. The DP state after
+    i variables is the running mine sum of every constraint that has some
+    variables assigned and some not; each state carries a polynomial counting
+    the partial assignments reaching it by number of mines. Full assignments
+    are never listed, so the cost grows with the number of open constraints
+    rather than with the number of solutions. cancelled, if given, is polled
+    after every variable of the forward and backward passes.
+    """
+
+    def __init__(self, n, constraints, cancelled=None):
+        self.order = frontier_order(n, constraints)
+        position = [0] * n  # var -> position in self.order
+        for i, v in enumerate(self.order):
+            position[v] = i
+
+        first = [min(position[v] for v in idxs) for idxs, _ in constraints]
+        last = [max(position[v] for v in idxs) for idxs, _ in constraints]
+        members = [{position[v] for v in idxs} for idxs, _ in constraints]
+
+        # Per step i: which constraints stay open afterwards (carry) and which
+        # are completed by the variable at position i (closing).
+        self.steps = []
+        open_before = []  # constraints open at the cut before position i
+        for i in range(n):
+            slot = {ci: s for s, ci in enumerate(open_before)}  # constraint -> index in the state tuple
+            open_after = [ci for ci in range(len(constraints)) if first[ci] <= i < last[ci]]
+            carry = [(slot.get(ci, -1), i in members[ci], constraints[ci][1],
+                      sum(1 for p in members[ci] if p > i)) for ci in open_after]
+            closing = [(slot.get(ci, -1), i in members[ci], constraints[ci][1])
+                       for ci in range(len(constraints)) if last[ci] == i]
+            self.steps.append((carry, closing))
+            open_before = open_after
+
+        # Forward pass: layers[i] maps state -> poly over mines among the first i variables.
+        self.layers = [{(): [1] + [0] * n}]
+        for i in range(n):
+            check_cancelled(cancelled)
+            layer = {}
+            for state, poly in self.layers[-1].items():
+                for val in (0, 1):
+                    nxt = self._advance(i, state, val)
+                    if nxt is None:
+                        continue
+                    shifted = [0] + poly[:-1] if val else poly
+                    acc = layer.get(nxt)
+                    layer[nxt] = shifted[:] if acc is None else [a + b for a, b in zip(acc, shifted)]
+            self.layers.append(layer)
+
+        super().__init__(n, self.layers[-1].get((), [0] * (n + 1)))
+        self.nodes = sum(len(layer) for layer in self.layers)
+
+    def _advance(self, i, state, val):
+        """State after giving the variable at position i the value val, or None if infeasible."""
+        carry, closing = self.steps[i]
+        for src, member, req in closing:
+            s = (state[src] if src >= 0 else 0) + (val if member else 0)
+            if s != req:
+                return None
+        nxt = []
+        for src, member, req, rest in carry:
+            s = (state[src] if src >= 0 else 0) + (val if member else 0)
+            if s > req or s + rest < req:
+                return None
+            nxt.append(s)
+        return tuple(nxt)
+
+    def marginals(self, weights, cancelled=None):
+        n = self.n
+        weights = list(weights[:n + 1]) + [0] * (n + 1 - len(weights))
+        # Backward pass: tail[state][a] = weighted completions given a mines so far.
+        tail = {(): weights}
+        mine_weight = [0] * n
+        for i in range(n - 1, -1, -1):
+            check_cancelled(cancelled)
+            prev = {}
+            mined = 0  # weighted count of assignments where the var at position i is a mine
+            for state, poly in self.layers[i].items():
+                acc = [0] * (n + 1)
+                for val in (0, 1):
+                    nxt = self._advance(i, state, val)
+                    rest = tail.get(nxt) if nxt is not None else None
+                    if rest is None:
+                        continue
+                    if val:
+                        shifted = rest[1:] + [0]
+                        mined += sum(p * w for p, w in zip(poly, shifted) if p)
+                        acc = [a + b for a, b in zip(acc, shifted)]
+                    else:
+                        acc = [a + b for a, b in zip(acc, rest)]
+                prev[state] = acc
+            mine_weight[self.order[i]] = mined
+            tail = prev
+        return mine_weight
+
+
+def count_component(n, constraints, cancelled=None):
+    """Solve one island exactly without enumerating assignments."""
+    return CountedIsland(n, constraints, cancelled)
+
+
+class IslandSampler:
+    """Estimates an island's histogram by random walks (Knuth's estimator).
+
+    Each walk assigns the variables in frontier_order, picking uniformly
+    among the values that keep every constraint satisfiable, and is weighted
+    by the product of the number of choices it had (0 on a dead end). The
+    expected histogram of one walk is then the exact {k: [solutions,
+    tallies]} histogram, so summed weights of a fixed number of walks are the
+    exact histogram up to a common factor, which combine_components ignores.
+    Weights are integers, so no precision is lost for large islands.
+
+    Walks are run in batches of batch_size; island() turns some or all of the
+    batches into an EnumeratedIsland, and the spread between batches gives
+    the error of the estimate.
+    """
+
+    def __init__(self, n, constraints, batch_size=50, seed=None):
+        self.n = n
+        self.order = frontier_order(n, constraints)
+        self.var_cons = [[] for _ in range(n)]  # var -> constraint indices
+        for ci, (idxs, _) in enumerate(constraints):
+            for v in idxs:
+                self.var_cons[v].append(ci)
+        self.required = [req for _, req in constraints]
+        self.sizes = [len(idxs) for idxs, _ in constraints]
+        self.batch_size = batch_size
+        self.rng = random.Random(seed)
+        self.batches = []  # one {k: [weight, tallies]} histogram per batch
+
+    def run_batch(self):
+        """Run batch_size more walks."""
+        n, order, var_cons, required = self.n, self.order, self.var_cons, self.required
+        getrandbits = self.rng.getrandbits
+        histogram = {}
+        for _ in range(self.batch_size):
+            sums = [0] * len(required)  # mines assigned per constraint
+            left = self.sizes[:]  # unassigned variables per constraint
+            weight = 1
+            mined = []  # variables set to mine by this walk
+            for v in order:
+                cons = var_cons[v]
+                can_skip = can_mine = True
+                for ci in cons:
+                    left[ci] -= 1
+                    need = required[ci] - sums[ci]
+                    if need > left[ci]:
+                        can_skip = False  # too few variables left without this one
+                    if need < 1:
+                        can_mine = False
+                if can_skip and can_mine:
+                    weight *= 2
+                    val = getrandbits(1)
+                elif can_skip or can_mine:
+                    val = can_mine
+                else:
+                    weight = 0
+                    break
+                if val:
+                    mined.append(v)
+                    for ci in cons:
+                        sums[ci] += 1
+            if not weight:
+                continue
+            entry = histogram.get(len(mined))
+            if entry is None:
+                entry = histogram[len(mined)] = [0, [0] * n]
+            entry[0] += weight
+            tallies = entry[1]
+            for v in mined:
+                tallies[v] += weight
+        self.batches.append(histogram)
+
+    def island(self, batches=None):
+        """EnumeratedIsland from the summed histograms of batches (default: all of them)."""
+        merged = {}
+        for histogram in self.batches if batches is None else batches:
+            for k, (weight, tallies) in histogram.items():
+                entry = merged.get(k)
+                if entry is None:
+                    merged[k] = [weight, tallies[:]]
+                else:
+                    entry[0] += weight
+                    entry[1] = [a + b for a, b in zip(entry[1], tallies)]
+        return EnumeratedIsland(self.n, merged)
+
+
+def canonical_form(positions, constraints):
+    """Key of an island that is the same for every translated, rotated or reflected copy.
+
+    positions[v] is the (row, col) of variable v and constraints holds
+    (variable indices, required) pairs. For each of the eight symmetries the
+    positions are transformed and moved to start at (0, 0), variables are
+    numbered in row-major order of their new positions and the constraints
+    rewritten with those numbers; the smallest of the eight results is the
+    key. Returns (key, label) where label[v] is v's number in the key.
+    """
+    n = len(positions)
+    best = None
+    for symmetry in SYMMETRIES:
+        moved = [symmetry(r, c) for r, c in positions]
+        r0 = min(r for r, _ in moved)
+        c0 = min(c for _, c in moved)
+        moved = [(r - r0, c - c0) for r, c in moved]
+        ranking = sorted(range(n), key=moved.__getitem__)
+        label = [0] * n
+        for i, v in enumerate(ranking):
+            label[v] = i
+        key = (tuple(moved[v] for v in ranking),
+               tuple(sorted((tuple(sorted(label[v] for v in idxs)), req) for idxs, req in constraints)))
+        if best is None or key < best[0]:
+            best = (key, label)
+    return best
+
+
+class PatternCache:
+    """Bounded LRU of enumerated islands keyed by canonical_form.
+
+    The same small frontier shapes (1-2-1 rows, 1-1 corners, lone clues)
+    come back again and again, within a board and across games, in any
+    position and orientation. island() looks a shape up by its canonical
+    form and only enumerates it on a miss; entries store the {k: [solutions,
+    tallies]} histogram with tallies in canonical numbering. hits and misses
+    count lookups. While added is a dict, new entries are also collected
+    there, so another process can merge them (see simulate.py).
+    """
+
+    def __init__(self, maxsize=PATTERN_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()  # canonical key -> histogram, least recently used first
+        self.hits = 0
+        self.misses = 0
+        self.added = None  # canonical key -> histogram inserted since the last take_added(), if collecting
+
+    def island(self, positions, constraints):
+        """EnumeratedIsland of the island with these variable positions and constraints."""
+        n = len(positions)
+        key, label = canonical_form(positions, constraints)
+        histogram = self.entries.get(key)
+        if histogram is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return EnumeratedIsland(n, {k: [count, [tallies[label[v]] for v in range(n)]]
+                                        for k, (count, tallies) in histogram.items()})
+
+        self.misses += 1
+        island = enumerate_component(n, constraints)
+        histogram = {}
+        for k, (count, tallies) in island.histogram.items():
+            canonical = [0] * n
+            for v, tally in enumerate(tallies):
+                canonical[label[v]] = tally
+            histogram[k] = [count, canonical]
+        self.insert(key, histogram)
+        if self.added is not None:
+            self.added[key] = histogram
+        return island
+
+    def insert(self, key, histogram):
+        self.entries[key] = histogram
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def take_added(self):
+        """Entries added since the last call, and start collecting again."""
+        added, self.added = self.added or {}, {}
+        return added
+
+    def update(self, entries):
+        """Merge {key: histogram} entries, e.g. from take_added() in another process."""
+        for key, histogram in entries.items():
+            self.insert(key, histogram)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "size": len(self.entries),
+                "hit_rate": self.hits / lookups if lookups else 0.0}
+
+    def save(self, path):
+        """Write the entries as JSON, least recently used first."""
+        entries = [[[list(p) for p in positions], [[list(idxs), req] for idxs, req in constraints],
+                    [[k, count, tallies] for k, (count, tallies) in histogram.items()]]
+                   for (positions, constraints), histogram in self.entries.items()]
+        with open(path, "w") as f:
+            json.dump({"version": 1, "entries": entries}, f, separators=(",", ":"))
+
+    def load(self, path):
+        """Merge entries saved by save(); a missing file is an empty cache. Returns the entries read."""
+        if not os.path.exists(path):
+            return 0
+        with open(path) as f:
+            data = json.load(f)
+        if data.get("version") != 1:
+            raise ValueError(f"unsupported pattern cache version in {path}")
+        for positions, constraints, histogram in data["entries"]:
+            key = (tuple(tuple(p) for p in positions), tuple((tuple(idxs), req) for idxs, req in constraints))
+            self.insert(key, {k: [count, tallies] for k, count, tallies in histogram})
+        return len(data["entries"])
+
+
+patterns = PatternCache()  # shared by every ProbabilityEngine in the process
+
+
+def _convolve(a, b):
+    """Multiply two polynomials given as coefficient lists."""
+    if len(a) < len(b):
+        a, b = b, a
+    out = [0] * (len(a) + len(b) - 1)
+    for j, y in enumerate(b):
+        if y:
+            out[j:j + len(a)] = map(add, out[j:j + len(a)], [x * y for x in a])
+    return out
+
+
+def _correlate(poly, tail, size):
+    """out[m] = sum of poly[c] * tail[m + c] over c, for m in range(size)."""
+    out = [0] * size
+    for c, x in enumerate(poly):
+        if x:
+            out = list(map(add, out, [x * w for w in tail[c:c + size]]))
+    return out
+
+
+def _rescaled(values):
+    """values divided by their largest entry."""
+    top = max(values)
+    return [x / top for x in values] if top else values
+
+
+def _pow2(exponent):
+    """round(2 ** exponent) as an int, for any float exponent."""
+    whole = math.floor(exponent)
+    mantissa = round(2.0 ** (exponent - whole) * (1 << 53))
+    shift = whole - 53
+    return mantissa << shift if shift >= 0 else mantissa >> -shift
+
+
+def _tilt(logs, remaining_mines, outside_count):
+    """Saddle point of the combination: the lam at which islands tilted by exp(lam * k) place,
+    on average, the number of frontier mines t where comb(outside_count, remaining_mines - t)
+    changes by a factor exp(lam) per mine.
+
+    logs[i] lists (k, log of island i's k-mine solutions). Found by bisection:
+    the tilted mean grows with lam and the binomial's log slope falls with t.
+    """
+    def mean(lam):
+        total = 0.0
+        for entries in logs:
+            peak = max(x + lam * k for k, x in entries)
+            weight = weighted = 0.0
+            for k, x in entries:
+                e = math.exp(x + lam * k - peak)
+                weight += e
+                weighted += k * e
+            total += weighted / weight
+        return total
+
+    def slope(t):  # d/dt log comb(outside_count, remaining_mines - t), smoothed at the ends
+        return (math.log(max(remaining_mines - t, 0) + 0.5)
+                - math.log(max(outside_count - remaining_mines + t, 0) + 0.5))
+
+    lo, hi = -TILT_LIMIT, TILT_LIMIT
+    for _ in range(30):
+        mid = (lo + hi) / 2
+        if slope(mean(mid)) > mid:
+            lo = mid
+        else:
+            hi = mid
+    return (lo + hi) / 2
+
+
+def _island_probabilities(island, tilted, lam, cancelled=None):
+    """P(mine) of every variable of island when its k-mine assignments weigh tilted[k] * exp(lam * k).
+
+    The weights are handed to the island as integers scaled to its own
+    counts, so counts far beyond float range stay exact. Returns None if
+    every weight underflowed.
+    """
+    logs = [math.log(w) + lam * k if w else None for k, w in enumerate(tilted)]
+    peak = max((math.log(count) + x for count, x in zip(island.poly, logs) if count and x is not None),
+               default=None)
+    if peak is None:
+        return None
+    bits = max(island.poly).bit_length() + 64  # largest count times weight is about 2 ** bits
+    weights = [0 if x is None else _pow2((x - peak) / LOG2 + bits) for x in logs]
+    total = sum(map(mul, island.poly, weights))
+    if not total:
+        return None
+    return [mined / total for mined in island.marginals(weights, cancelled)]
+
+
+def combine_components(islands, remaining_mines, outside_count, cancelled=None):
+    """Merge solved islands with the global mine count.
+
+    Every combination of island assignments placing t mines on the frontier is
+    weighted by comb(outside_count, remaining_mines - t), the number of ways to
+    put the leftover mines in the unconstrained outside region.
+
+    Exact binomials of a large outside region are huge integers, so the
+    product of the island polynomials and the outside weights are kept as
+    floats instead. Both span far more than the float range, so every island
+    is first tilted by exp(lam * k) with lam at the saddle point (_tilt):
+    the tilt cancels in the product, and afterwards the terms that matter
+    sit near the top of every rescaled vector. A backward pass then gives
+    each island the weight of its k-mine assignments, which
+    _island_probabilities turns into marginals. cancelled, if given, is
+    polled per island.
+
+    Returns (probabilities, outside_prob) where probabilities[i][v] is
+    P(mine) for variable v of island i, or None when no combination is
+    consistent with the mine count.
+    """
+    def log_comb(t):
+        outside_mines = remaining_mines - t  # mines that must go in the outside region
+        if outside_mines < 0 or outside_mines > outside_count:
+            return None
+        return (math.lgamma(outside_count + 1) - math.lgamma(outside_mines + 1)
+                - math.lgamma(outside_count - outside_mines + 1))
+
+    logs = []  # logs[i] = (k, log of the solutions of island i with k mines)
+    for island in islands:
+        entries = [(k, math.log(count)) for k, count in enumerate(island.poly) if count]
+        if not entries:
+            return None
+        logs.append(entries)
+    lam = _tilt(logs, remaining_mines, outside_count)
+
+    polys = []  # polys[i][k] ~ solutions of island i with k mines, times exp(lam * k)
+    for island, entries in zip(islands, logs):
+        peak = max(x + lam * k for k, x in entries)
+        poly = [0.0] * len(island.poly)
+        for k, x in entries:
+            poly[k] = math.exp(x + lam * k - peak)
+        polys.append(poly)
+
+    prefix = [[1.0]]  # prefix[i] ~ product of polys before island i
+    for poly in polys:
+        check_cancelled(cancelled)
+        prefix.append(_rescaled(_convolve(prefix[-1], poly)))
+    final = prefix[-1]
+
+    # Outside weight by frontier mine count, times exp(-lam * t), scaled so
+    # that the largest combined term is 1.
+    logs = [log_comb(t) for t in range(len(final))]
+    logs = [None if x is None else x - lam * t for t, x in enumerate(logs)]
+    peak = max((math.log(count) + x for count, x in zip(final, logs) if count and x is not None), default=None)
+    if peak is None:
+        return None
+    tail = [0.0 if x is None else math.exp(min(x - peak, 600.0)) for x in logs]
+
+    total_weight = sum(map(mul, final, tail))  # sum of weights over all consistent combinations
+    outside_mines_weighted_sum = sum(count * w * (remaining_mines - t)
+                                     for t, (count, w) in enumerate(zip(final, tail)))
+
+    # Walking back, tail[m] ~ weight of the islands from i on together with
+    # the outside, given m mines on the islands before i.
+    probabilities = [None] * len(islands)
+    for i in range(len(islands) - 1, -1, -1):
+        check_cancelled(cancelled)
+        before = prefix[i]
+        tilted = [sum(map(mul, before, tail[k:])) for k in range(len(polys[i]))]
+        probabilities[i] = _island_probabilities(islands[i], tilted, lam, cancelled)
+        if probabilities[i] is None:
+            return None
+        tail = _rescaled(_correlate(polys[i], tail, len(before)))
+
+    outside_prob = outside_mines_weighted_sum / (outside_count * total_weight) if outside_count > 0 else 0.0
+    return probabilities, outside_prob
+
+
+def combine_components_exact(islands, remaining_mines, outside_count, cancelled=None):
+    """combine_components in exact integer arithmetic.
+
+    The binomials have about as many bits as the outside region has tiles,
+    so this is far too slow for the game; benchmark.py --check compares
+    combine_components against it.
+    """
+    prefix = [[1]]  # prefix[i] = product of the polys before island i
+    for island in islands:
+        prefix.append(_convolve(prefix[-1], island.poly))
+    final = prefix[-1]
+    tail = [math.comb(outside_count, remaining_mines - t) if 0 <= remaining_mines - t <= outside_count else 0
+            for t in range(len(final))]
+    total_weight = sum(map(mul, final, tail))
+    if total_weight == 0:
+        return None
+    outside_mines_weighted_sum = sum(count * w * (remaining_mines - t)
+                                     for t, (count, w) in enumerate(zip(final, tail)))
+
+    probabilities = [None] * len(islands)
+    for i in range(len(islands) - 1, -1, -1):
+        check_cancelled(cancelled)
+        island, before = islands[i], prefix[i]
+        weights = [sum(map(mul, before, tail[k:])) for k in range(len(island.poly))]
+        island_total = sum(map(mul, island.poly, weights))
+        probabilities[i] = [mined / island_total for mined in island.marginals(weights)]
+        tail = _correlate(island.poly, tail, len(before))
+
+    outside_prob = outside_mines_weighted_sum / (outside_count * total_weight) if outside_count > 0 else 0.0
+    return probabilities, outside_prob
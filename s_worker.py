@@ -0,0 +1,73 @@
+import threading
+from s_logic import Board, SolveCancelled
+
+
+class ProbabilityWorker:
+    """Computes mine probabilities on a background thread.
+
+    submit() hands over a snapshot of the board (its save_state bytes) and
+    returns at once; the worker keeps its own mirror Board, syncs it to the
+    snapshot and solves it, so the engine caches survive between requests.
+    A newer submit() cancels the solve in flight at its next island. The
+    game calls poll() once per frame to pick up finished results, the
+    (probs, outside_prob) pairs of Board.probabilities().
+    """
+
+    def __init__(self, **options):
+        self.options = options  # keyword arguments for the engine solve, e.g. time_budget to sample
+        self.lock = threading.Condition()
+        self.generation = 0  # id of the newest request
+        self.request = None  # (generation, rows, cols, mines, state) waiting for the worker
+        self.result = None  # (generation, result) not yet returned by poll()
+        self.done = 0  # generation of the newest finished solve
+        self.mirror = None  # worker-owned Board, never touched by the game thread
+        self.thread = threading.Thread(target=self.run, name="probability-worker", daemon=True)
+        self.thread.start()
+
+    @property
+    def busy(self):
+        """True while the newest request has no result yet."""
+        return self.done != self.generation
+
+    def submit(self, board):
+        """Queue a solve of board's current position, cancelling any older one."""
+        with self.lock:
+            self.generation += 1
+            self.request = (self.generation, board.rows, board.cols, board.total_mines, board.save_state())
+            self.lock.notify()
+        return self.generation
+
+    def poll(self):
+        """Return the newest finished result once (None if no new one since the last poll)."""
+        with self.lock:
+            result, self.result = self.result, None
+        return None if result is None else result[1]
+
+    def cancelled(self, generation):
+        return generation != self.generation
+
+    def run(self):
+        while True:
+            with self.lock:
+                while self.request is None:
+                    self.lock.wait()
+                generation, rows, cols, mines, state = self.request
+                self.request = None
+
+            mirror = self.mirror
+            if mirror is None or (mirror.rows, mirror.cols, mirror.total_mines) != (rows, cols, mines):
+                mirror = self.mirror = Board(rows, cols, mines, seed=0)
+            mirror.sync_state(state)
+            mirror.dirty_tiles.clear()  # nothing draws the mirror
+            try:
+                result = mirror.probabilities(cancelled=lambda: self.cancelled(generation), **self.options)
+            except SolveCancelled:
+                continue
+            except Exception:
+                # Don't let probability calculation break the game loop.
+                result = None
+
+            with self.lock:
+                if generation == self.generation:
+                    self.result = (generation, result)
+                    self.done = generation
@@ -1,5 +1,4 @@
 # COLORS (r, g, b)
-import pygame
 import os
 
 WHITE = (255, 255, 255)
@@ -17,26 +16,51 @@ BGCOLOUR = DARKGREY
 TILESIZE = 32
 ROWS = 15
 COLS = 25
+CUSTOM_MINES = None  # mine count set with configure(); None uses DIFFICULTY
+LAZY_BOARD = False  # generate mines per chunk as the board is explored (s_lazy.LazyBoard)
+# WIDTH x HEIGHT is the board viewport on screen: the whole board when it
+# fits, otherwise a scrollable window onto it (see configure()).
+MIN_VIEW_WIDTH, MIN_VIEW_HEIGHT = 480, 480
+MAX_VIEW_WIDTH, MAX_VIEW_HEIGHT = 1280, 800
 WIDTH = TILESIZE * COLS
 HEIGHT = TILESIZE * ROWS
 FPS = 60
+SCROLL_SPEED = 16  # pixels per frame while an arrow key is held
 TITLE = "Minesweeper Clone"
 CHEAT_ENABLED = False
 
 # Abilities
 DETECT_CHARGES = 5
 
-tile_numbers = []
-for i in range(1, 9):
-    tile_numbers.append(pygame.transform.scale(pygame.image.load(os.path.join("assets", f"Tile{i}.png")), (TILESIZE, TILESIZE)))
+# Save file written with F5 and read back with F9
+SAVE_PATH = "savegame.msw"
 
 font_path = os.path.join("assets", "RobotoRemix.ttf")
-tile_empty = pygame.transform.scale(pygame.image.load(os.path.join("assets", "TileEmpty.png")), (TILESIZE, TILESIZE))
-tile_exploded = pygame.transform.scale(pygame.image.load(os.path.join("assets", "TileExploded.png")), (TILESIZE, TILESIZE))
-tile_flag = pygame.transform.scale(pygame.image.load(os.path.join("assets", "TileFlag.png")), (TILESIZE, TILESIZE))
-tile_mine = pygame.transform.scale(pygame.image.load(os.path.join("assets", "TileMine.png")), (TILESIZE, TILESIZE))
-tile_unknown = pygame.transform.scale(pygame.image.load(os.path.join("assets", "TileUnknown.png")), (TILESIZE, TILESIZE))
-tile_not_mine = pygame.transform.scale(pygame.image.load(os.path.join("assets", "TileNotMine.png")), (TILESIZE, TILESIZE))
+
+# Tile images, filled in by load_assets() on first render so that the game
+# logic can be imported without pygame.
+tile_numbers = []
+tile_size_loaded = None  # TILESIZE the tile images were scaled to
+tile_empty = tile_exploded = tile_flag = tile_mine = tile_unknown = tile_not_mine = None
+
+def load_assets():
+    global tile_empty, tile_exploded, tile_flag, tile_mine, tile_unknown, tile_not_mine, tile_size_loaded
+    if tile_numbers:
+        return
+    import pygame
+    tile_size_loaded = TILESIZE
+
+    def load(name):
+        return pygame.transform.scale(pygame.image.load(os.path.join("assets", name)), (TILESIZE, TILESIZE))
+
+    for i in range(1, 9):
+        tile_numbers.append(load(f"Tile{i}.png"))
+    tile_empty = load("TileEmpty.png")
+    tile_exploded = load("TileExploded.png")
+    tile_flag = load("TileFlag.png")
+    tile_mine = load("TileMine.png")
+    tile_unknown = load("TileUnknown.png")
+    tile_not_mine = load("TileNotMine.png")
 
 # Button styling
 BUTTON_COLOUR = (70, 70, 70)
@@ -58,4 +82,41 @@ DIFFICULTY_MINES = {
 }
 
 def get_mine_amount():
-    return DIFFICULTY_MINES.get(DIFFICULTY, 50)
+    """Mines for a new board: CUSTOM_MINES, or the difficulty's density applied to ROWS x COLS."""
+    if CUSTOM_MINES is not None:
+        return CUSTOM_MINES
+    return difficulty_mines(DIFFICULTY, ROWS, COLS)
+
+
+def difficulty_mines(difficulty, rows, cols):
+    """Mines for a rows x cols board at the density of difficulty."""
+    mines = DIFFICULTY_MINES.get(difficulty, 50)
+    if (rows, cols) != (15, 25):
+        mines = max(1, round(mines * rows * cols / (15 * 25)))  # counts above are for the default 15 x 25
+    return max(0, min(mines, rows * cols - 9))  # the first click keeps up to 9 tiles free; tiny boards get none
+
+
+def configure(rows=None, cols=None, mines=None, tilesize=None, lazy=None):
+    """Change the board size, mine count or tile size at runtime.
+
+    The viewport (WIDTH x HEIGHT) follows the board but stays within the
+    MIN_VIEW_* / MAX_VIEW_* limits, so huge boards scroll instead of growing
+    the window. lazy switches new games to chunk-by-chunk generated boards.
+    """
+    global ROWS, COLS, CUSTOM_MINES, TILESIZE, WIDTH, HEIGHT, UNDO_BUTTON_X, UNDO_BUTTON_Y, LAZY_BOARD
+    LAZY_BOARD = LAZY_BOARD if lazy is None else lazy
+    ROWS = ROWS if rows is None else rows
+    COLS = COLS if cols is None else cols
+    TILESIZE = TILESIZE if tilesize is None else tilesize
+    if ROWS < 1 or COLS < 1:
+        raise ValueError(f"board must be at least 1 x 1, got {ROWS} x {COLS}")
+    if mines is not None:
+        if not 0 <= mines <= max(0, ROWS * COLS - 9):
+            raise ValueError(f"{mines} mines do not fit on a {ROWS} x {COLS} board")
+        CUSTOM_MINES = mines
+    if TILESIZE != tile_size_loaded and tile_numbers:
+        tile_numbers.clear()  # reload at the new size
+    WIDTH = min(max(COLS * TILESIZE, MIN_VIEW_WIDTH), MAX_VIEW_WIDTH)
+    HEIGHT = min(max(ROWS * TILESIZE, MIN_VIEW_HEIGHT), MAX_VIEW_HEIGHT)
+    UNDO_BUTTON_X = WIDTH // 2 - UNDO_BUTTON_WIDTH // 2
+    UNDO_BUTTON_Y = HEIGHT + 20
@@ -0,0 +1,171 @@
+"""Batch game simulator and solver benchmark.
+
+Plays seeded games headlessly: the first click goes to the centre of the
+board, then each solve (Board.best_moves, sampled with --time-budget, which
+trades accuracy for latency on big frontiers) digs every tile proven safe,
+or the best guess if there is none. Games run in a process pool and the
+report (win rate, moves per second, solve-time percentiles, pattern cache
+hits) is printed as JSON.
+
+Each worker process keeps the solver's pattern cache (s_solver.patterns)
+across its games; with --patterns the cache is also loaded from a file
+before the run and saved with everything learned after it.
+
+    python simulate.py --games 500 --difficulty HARD --workers 8 --output hard.json
+    python simulate.py --games 500 --patterns patterns.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import settings
+from s_logic import Board
+from s_solver import patterns
+
+def play_game(task):
+    """Play one game; task is (difficulty, seed, rows, cols, time_budget). Returns a result dict."""
+    difficulty, seed, rows, cols, time_budget = task
+    board = Board(rows, cols, settings.difficulty_mines(difficulty, rows, cols), seed=seed)
+    start = time.perf_counter()
+    hits, misses = patterns.hits, patterns.misses
+
+    row, col = rows // 2, cols // 2
+    board.start_placing(row, col)
+    alive = board.dig(row, col)
+    moves = 1
+    solve_times = []  # seconds per solve
+    options = {} if time_budget is None else {"time_budget": time_budget}
+    while alive and not board.check_win():
+        t = time.perf_counter()
+        safe, _, guesses = board.best_moves(limit=1, **options)
+        solve_times.append(time.perf_counter() - t)
+        for row, col in safe or [guesses[0][0]]:
+            if board.revealed[row * cols + col]:
+                continue  # opened by an earlier dig of this batch
+            alive = board.dig(row, col)
+            moves += 1
+            if not alive:
+                break
+
+    return {
+        "difficulty": difficulty,
+        "seed": seed,
+        "won": alive,
+        "moves": moves,
+        "seconds": time.perf_counter() - start,
+        "solve_times": solve_times,
+        "pattern_hits": patterns.hits - hits,
+        "pattern_misses": patterns.misses - misses,
+        "patterns": patterns.take_added() if patterns.added is not None else {},  # for the parent's cache file
+    }
+
+
+def load_patterns(path):
+    """Worker initializer: start from the saved pattern cache and collect what is added to it."""
+    patterns.load(path)
+    patterns.added = {}
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list (0.0 when empty)."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def summarize(results):
+    solve_times = sorted(t for r in results for t in r["solve_times"])
+    moves = sum(r["moves"] for r in results)
+    seconds = sum(r["seconds"] for r in results)
+    wins = sum(r["won"] for r in results)
+    hits = sum(r["pattern_hits"] for r in results)
+    lookups = hits + sum(r["pattern_misses"] for r in results)
+    return {
+        "games": len(results),
+        "wins": wins,
+        "win_rate": wins / len(results) if results else 0.0,
+        "moves": moves,
+        "moves_per_second": moves / seconds if seconds else 0.0,
+        "solve_ms": {
+            "count": len(solve_times),
+            "mean": 1000 * sum(solve_times) / len(solve_times) if solve_times else 0.0,
+            "p50": 1000 * percentile(solve_times, 50),
+            "p95": 1000 * percentile(solve_times, 95),
+            "p99": 1000 * percentile(solve_times, 99),
+            "max": 1000 * solve_times[-1] if solve_times else 0.0,
+        },
+        "pattern_cache": {"hits": hits, "lookups": lookups, "hit_rate": hits / lookups if lookups else 0.0},
+    }
+
+
+def run(difficulties, games, *, seed=0, rows=None, cols=None, workers=None, time_budget=None, patterns_path=None):
+    """Play games per difficulty across a process pool and return the report dict.
+
+    With patterns_path, the workers start from that pattern cache file and
+    the file is rewritten with the entries they added.
+    """
+    rows = settings.ROWS if rows is None else rows
+    cols = settings.COLS if cols is None else cols
+    tasks = [(difficulty, seed + i, rows, cols, time_budget) for difficulty in difficulties for i in range(games)]
+
+    start = time.perf_counter()
+    chunksize = max(1, len(tasks) // (4 * (workers or os.cpu_count() or 1)))
+    initializer = (load_patterns, (patterns_path,)) if patterns_path else (None, ())
+    with ProcessPoolExecutor(max_workers=workers, initializer=initializer[0], initargs=initializer[1]) as pool:
+        results = list(pool.map(play_game, tasks, chunksize=chunksize))
+    wall = time.perf_counter() - start
+
+    if patterns_path:
+        patterns.load(patterns_path)
+        for result in results:
+            patterns.update(result["patterns"])
+        patterns.save(patterns_path)
+
+    return {
+        "rows": rows,
+        "cols": cols,
+        "seed": seed,
+        "games_per_difficulty": games,
+        "time_budget": time_budget,
+        "wall_seconds": wall,
+        "difficulties": {
+            difficulty: summarize([r for r in results if r["difficulty"] == difficulty])
+            for difficulty in difficulties
+        },
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--difficulty", choices=sorted(settings.DIFFICULTY_MINES), action="append",
+                        help="difficulty to play (repeatable, default: all)")
+    parser.add_argument("--games", type=int, default=100, help="games per difficulty")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game; game i uses seed + i")
+    parser.add_argument("--rows", type=int, default=settings.ROWS)
+    parser.add_argument("--cols", type=int, default=settings.COLS)
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--time-budget", type=float, default=None,
+                        help="sample large islands for this many seconds per move instead of solving them exactly")
+    parser.add_argument("--patterns", help="pattern cache file to start from and update (created if missing)")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    difficulties = args.difficulty or list(settings.DIFFICULTY_MINES)
+    report = run(difficulties, args.games, seed=args.seed, rows=args.rows, cols=args.cols, workers=args.workers,
+                 time_budget=args.time_budget, patterns_path=args.patterns)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())